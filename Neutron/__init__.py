@@ -1,184 +1,1021 @@
 
-from PyQt6.QtCore import QUrl
-from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtCore import QThread
-from bs4 import BeautifulSoup
+# PyQt6, bs4 and websockets are imported when they are first needed, Qt only when a window is shown
 import json
 from . import elements
+from . import build
+from .batch import Batch, BatchResult, batch_script
+from .dispatch import Dispatcher, cpu_bound
+from .stats import Stats
+from .reactive import State, ObservableList, Binding, ListBinding, Updates
+from .virtual import VirtualList
+from .mirror import Mirror
+from .registry import Registry
+from .assets import AssetCache, AssetServer, start_asset_server
+from . import buffers
+from .codec import JSONCodec, OrjsonCodec, default_codec
+from .reload import FileWatcher
 import sys
 import os
 import logging
 import asyncio
 import threading
-import websockets
-from websockets.exceptions import ConnectionClosedOK
-from http.server import SimpleHTTPRequestHandler, HTTPServer
-
-global api_functions
-api_functions = {}
-
-class ListenerHTTPServer(SimpleHTTPRequestHandler):
-    def log_message(self, format, *args):
-        # Disable log messages
-        pass
-
-    def _set_headers(self):
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-
-    def do_GET(self):
-        super().do_GET()
-
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self._set_headers()
-        self.end_headers()
-
-    def do_POST(self):
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
-        post_data = post_data.decode('utf-8')
-        data = json.loads(post_data)
-
-        if data["type"] == "bridge":
-            api_functions[data['function']](*data['parameters'])
-            self.send_response(200)
-            self._set_headers()
-            self.end_headers()
-        else:
-            self.send_response(500)
-            self._set_headers()
-            self.end_headers()
+import itertools
+import time
+import concurrent.futures
+import urllib.parse
+import base64
+
+# Functions registered with Neutron.event(), windows look functions up here after their own registry
+shared_handlers = Registry("s")
+
+def start_listener_server(port, root=None, max_age=0):
+    # Only serves static files, bridge calls are sent over the websocket
+    return start_asset_server(port, root or build.resource_path("."), max_age)
+
+class Bridge:
+    """
+    The websocket server the pages connect to, shared by every window of the process, it runs on the event loop of the application.\n
+    A page names its window when it connects, its messages are then routed to the channel of that window.
+    """
+    def __init__(self, port, loop):
+        self.port = port
+        self.loop = loop
 
+        self.channels = {} # Window ID -> WebSocketSendServer
+        self.lock = threading.Lock()
 
-def start_listener_server(port):
-    httpd = HTTPServer(('', port), ListenerHTTPServer)
-    httpd.serve_forever()
+        # Set once the server accepts connections
+        self.listening = threading.Event()
 
-class WebSocketSendServer(QThread):
-    client = None
+    def add(self, channel):
+        with self.lock:
+            self.channels[channel.window_id] = channel
 
-    def __init__(self, port):
-        super().__init__()
-        self.pending_response = None
-        self.port = port
+    def remove(self, channel):
+        with self.lock:
+            if self.channels.get(channel.window_id) is channel:
+                del self.channels[channel.window_id]
 
     async def handler(self, websocket):
-        self.client = websocket
+        from websockets.exceptions import ConnectionClosed, ConnectionClosedOK
+
+        channel = None
 
         try:
             while True:
                 try:
                     message = await websocket.recv()
-                    if self.pending_response:
-                        self.pending_response.set_result(message)
+
+                    if channel is not None:
+                        channel.receive(message)
+                        continue
+
+                    # The first message of a page is the handshake, "connect <window ID>"
+                    command, _, window_id = message.partition(" ")
+                    with self.lock:
+                        channel = self.channels.get(window_id) if command == "connect" else None
+                    if channel is None:
+                        logging.warning(f"Connection from unknown window {window_id!r} refused")
+                        break
+                    channel.connect(websocket)
 
                 except ConnectionClosedOK:
                     print(f"Client {websocket} disconnected gracefully.")
                     break
-                except websockets.exceptions.ConnectionClosed as e:
+                except ConnectionClosed as e:
                     print(f"Connection closed unexpectedly: {e}")
                     break
         finally:
-            self.client = None
+            if channel is not None:
+                channel.disconnect(websocket)
 
     async def start_server(self):
-        async with websockets.serve(self.handler, "localhost", self.port):  # Optional max size for messages
+        import websockets
+
+        # The loop only keeps a weak reference to its tasks
+        self.task = asyncio.current_task()
+
+        # No size limit, binary messages from the page (i.e files passed to bridge()) can be large
+        async with websockets.serve(self.handler, "localhost", self.port, max_size=None):
+            self.listening.set()
             await asyncio.Future()  # Run forever
 
-    async def send_and_wait(self, message: str) -> str:
-        if not self.client:
-            raise RuntimeError("No client connected")
+    def start(self):
+        def started(future):
+            if future.exception() is not None:
+                logging.error(f"The websocket server could not be started on port {self.port}", exc_info=future.exception())
+
+        asyncio.run_coroutine_threadsafe(self.start_server(), self.loop).add_done_callback(started)
+
+class JavaScriptError(RuntimeError):
+    """
+    An exception thrown by JavaScript run in the page, `name` is the name of the JavaScript error (i.e `TypeError`).
+    """
+    def __init__(self, name, message, stack=None):
+        super().__init__(f"JavaScript error: {name}: {message}")
+        self.name = name
+        self.message = message
+        self.stack = stack
+
+class WebSocketSendServer:
+    # The end of the bridge that belongs to one window
+    client = None
 
-        # Create a future to await the response
-        self.pending_response = asyncio.get_event_loop().create_future()
+    def __init__(self, bridge, window_id, dispatcher, stats, on_connect=None, mirror=None, handlers=None, on_release=None, codec=None):
+        self.bridge = bridge
+        self.window_id = window_id
+        self.dispatcher = dispatcher
+        self.loop = application.loop
+        self.stats = stats
+        self.codec = codec or default_codec()
 
-        await self.client.send(message)
+        # In-flight calls, keyed by the correlation ID echoed back by the page
+        self.pending = {}
+        self.timings = {} # Only used when stats are enabled: ID -> (operation, start time, bytes sent)
+        self.pending_lock = threading.Lock()
+        self.request_ids = itertools.count()
 
-        # Wait for the future to be done
-        while True:
-            if self.pending_response.done():
-                result = self.pending_response.result()
-                self.pending_response = None
-                return result
+        # Highest ID sent to the page and highest ID it replied to, the page replies in order
+        self.submitted = -1
+        self.replied = -1
+        self.mirror = mirror
 
+        # Looks up the python function called by the page, on_release is called with elements removed from the page
+        self.handlers = handlers or shared_handlers.get
+        self.on_release = on_release
 
-    def run(self):
-        asyncio.run(self.start_server())
+        # Set once the page completed the handshake
+        self.connected = threading.Event()
+        self.on_connect = on_connect
+
+        # Messages sent before the page connected, sent in order on connect
+        self.backlog = []
+
+    def start(self):
+        if self.bridge is not None:
+            self.bridge.add(self)
+
+    def close(self):
+        # The window was closed, calls still waiting for the page fail
+        if self.bridge is not None:
+            self.bridge.remove(self)
+        self.connected.clear()
+        self.fail_pending(ConnectionError("The window was closed before the page responded"))
+
+    def receive(self, message):
+        try:
+            # Binary messages are bridge calls with buffers among their parameters
+            data = buffers.unpack_call(message) if isinstance(message, bytes) else self.codec.loads(message)
+        except ValueError:
+            return # Not an RPC message
+
+        if not isinstance(data, dict):
+            return
+
+        if data.get("type") == "mirror":
+            if self.mirror is not None:
+                self.mirror.update(data["elements"])
+            return
+
+        if data.get("type") == "released":
+            if self.on_release is not None:
+                self.on_release(data["elements"])
+            return
+
+        if data.get("type") == "bridge":
+            function = self.handlers(data['function'])
+            if function is None:
+                logging.warning(f"Bridge function {data['function']} is not registered!")
+            else:
+                if self.stats.enabled:
+                    self.stats.bridge_event(data['function'], getattr(function, "__qualname__", data['function']), len(message))
+
+                # Handlers run outside of the event loop so they can call Window.run_javascript()
+                self.dispatcher.submit(function, data['parameters'], data.get('source'), data['function'])
+            return
+
+        if "id" not in data:
+            return
+
+        with self.pending_lock:
+            future = self.pending.pop(data["id"], None)
+            timing = self.timings.pop(data["id"], None)
+            self.replied = max(self.replied, data["id"])
+
+        if timing is not None:
+            self.stats.round_trip(timing[0], timing[1], timing[2], len(message))
+
+        # The call has already timed out or was cancelled
+        if future is None or future.done():
+            return
+
+        if data["type"] == "result":
+            future.set_result(data["result"])
+        elif data["type"] == "error":
+            error = data["error"]
+            future.set_exception(JavaScriptError(error["name"], error["message"], error.get("stack")))
+
+    def connect(self, websocket):
+        # The page completed the handshake, send what was queued before it connected
+        with self.pending_lock:
+            self.client = websocket
+            backlog, self.backlog = self.backlog, []
+            self.connected.set()
+
+        for message in backlog:
+            self.send(message)
+
+        if self.on_connect:
+            self.on_connect()
+
+    def disconnect(self, websocket):
+        # A newer connection of the page (i.e after a reload) replaced this one
+        if self.client is not websocket:
+            return
+
+        self.client = None
+        self.connected.clear()
+        self.fail_pending(ConnectionError("Client disconnected before responding"))
+
+    def send(self, message):
+        client = self.client
+
+        async def send():
+            await client.send(message)
+
+        return asyncio.run_coroutine_threadsafe(send(), self.loop)
+
+    def fail_pending(self, exception):
+        with self.pending_lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+            self.timings.clear()
+            # The failed calls will never get a reply, the mirror must not wait for them (see settled())
+            self.replied = self.submitted
+
+        for future in pending:
+            if not future.done():
+                future.set_exception(exception)
+
+    def submit(self, javascript: str, operation: str = "run_javascript") -> concurrent.futures.Future:
+        """
+        Send `javascript` to the page without blocking. Can be called from any thread.\n
+        Returns a `concurrent.futures.Future` that resolves to the response of the page.
+        If the page has not connected yet the message is sent once it does.
+        """
+        request_id = next(self.request_ids)
+        message = self.codec.dumps({"type": "eval", "id": request_id, "javascript": javascript})
+        return self.enqueue(request_id, message, operation)
+
+    def submit_call(self, function: str, args, operation: str = "call") -> concurrent.futures.Future:
+        """
+        Call the JavaScript function `function` (a global name or a dotted path, i.e `console.log`) with `args`
+        without blocking, see `Window.call()`. The arguments are sent as values, not as JavaScript source.
+        """
+        request_id = next(self.request_ids)
+        message = self.codec.dumps({"type": "call", "id": request_id, "function": function, "args": list(args)})
+        return self.enqueue(request_id, message, operation)
+
+    def submit_buffer(self, name: str, data, operation: str = "send_buffer") -> concurrent.futures.Future:
+        """
+        Send `data` (any object supporting the buffer protocol) to the page as a binary message, see `Window.send_buffer()`.\n
+        Returns a `concurrent.futures.Future` that resolves once the page received it.
+        """
+        request_id = next(self.request_ids)
+        message = buffers.pack({"type": "buffer", "id": request_id, "name": name}, data)
+        return self.enqueue(request_id, message, operation)
+
+    def enqueue(self, request_id, message, operation):
+        future = concurrent.futures.Future()
+
+        # Forget the call once it is resolved, timed out or cancelled
+        def forget(_):
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+                self.timings.pop(request_id, None)
+                if any(queued is message for queued in self.backlog):
+                    self.backlog = [queued for queued in self.backlog if queued is not message]
+
+        def sent(send_future):
+            if send_future.exception() and not future.done():
+                future.set_exception(send_future.exception())
+
+        with self.pending_lock:
+            self.pending[request_id] = future
+            self.submitted = max(self.submitted, request_id)
+            if self.stats.enabled:
+                self.timings[request_id] = (operation, time.perf_counter(), buffers.size(message))
+
+            queued = not self.connected.is_set()
+            if queued:
+                self.backlog.append(message)
+
+        future.add_done_callback(forget)
+
+        if not queued:
+            self.send(message).add_done_callback(sent)
+
+        return future
+
+    def settled(self):
+        # True when the page has replied to every message sent to it
+        return self.connected.is_set() and self.replied >= self.submitted
+
+    def send_and_wait(self, javascript: str, timeout: float = None, operation: str = "run_javascript"):
+        return self.wait(lambda: self.submit(javascript, operation), timeout)
+
+    def can_wait(self):
+        # Responses are received on the event loop of the application, it must not wait for them
+        return threading.current_thread() is not application.loop_thread
+
+    def wait(self, submit, timeout=None):
+        # Submit a message with `submit()` and wait for the response of the page
+        if not self.can_wait():
+            raise RuntimeError("send_and_wait() would block the thread that receives the response")
 
-def event(function):
+        future = submit()
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError("No response received within the timeout period.")
+
+class QtChannel(WebSocketSendServer):
+    """
+    The end of the bridge of a window using the in-process transport, `Window(transport="qt")`.\n
+    Messages go through a QWebChannel instead of a websocket, binary messages as base64 text prefixed with "#".
+    """
+    def __init__(self, window_id, *args, **kwargs):
+        super().__init__(None, window_id, *args, **kwargs)
+
+    def attach(self, page):
+        # Called on the main thread once the view of the window is created, before the page is loaded
+        from . import inprocess
+        self.channel_object = inprocess.attach(page, self.receive_text)
+
+    def receive_text(self, message):
+        if message.startswith("connect "):
+            self.connect(self.channel_object)
+        elif message.startswith("#"):
+            self.receive(base64.b64decode(message[1:]))
+        else:
+            self.receive(message)
+
+    def send(self, message):
+        if isinstance(message, list):
+            message = "#" + base64.b64encode(b"".join(message)).decode()
+
+        # Signals emitted from other threads are delivered on the main thread, in order
+        self.client.message.emit(message)
+
+        future = concurrent.futures.Future()
+        future.set_result(None)
+        return future
+
+    def can_wait(self):
+        # Messages from the page are received on the main thread as well
+        return super().can_wait() and threading.current_thread() is not threading.main_thread()
+
+def rate_limit(throttle_ms=None, debounce_ms=None, coalesce=None):
+    if coalesce not in (None, "latest", "all"):
+        raise ValueError('coalesce must be "latest" or "all"')
+
+    for name, value in (("throttle_ms", throttle_ms), ("debounce_ms", debounce_ms)):
+        if value is not None and value < 0:
+            raise ValueError(f"{name} can not be negative")
+
+    if throttle_ms is None and debounce_ms is None and coalesce is None:
+        return None
+
+    return {"throttle_ms": throttle_ms, "debounce_ms": debounce_ms, "coalesce": coalesce or "latest"}
+
+def bridge_call(function_id, limits, params=""):
+    # Returns the JavaScript that calls the python function, rate limited in the page if limits are given
+    if limits is None:
+        return f"bridge('{function_id}'{params})"
+    # Written without double quotes so it can be used inside an HTML attribute
+    options = ", ".join(f"{key}: " + ("null" if value is None else repr(value)) for key, value in limits.items())
+    return f"bridgeLimited('{function_id}', {{{options}}}{params})"
+
+def event(function, throttle_ms=None, debounce_ms=None, coalesce=None):
+    # Shared by every window, use Window.event() to register the function with a window, an owner or weakly
     if callable(function):
-        if not str(function) in api_functions:
-            api_functions.update({str(function): function})
-        return f"bridge('{str(function)}')"
+        limits = rate_limit(throttle_ms, debounce_ms, coalesce)
+        return bridge_call(shared_handlers.register(function), limits)
     else:
         raise TypeError("Event attribute is not a function!")
 
+def unregister(function):
+    # Remove a function registered with Neutron.event()
+    return shared_handlers.unregister(function)
+
+class Application:
+    """
+    The QApplication (and so the QtWebEngine profile), the event loop, the bridge and the asset servers shared by every window
+    of the process. Windows can be opened and closed while it runs, it stops once the last window is closed.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = None
+        self.lock = threading.Lock()
+        self.window_ids = itertools.count()
+
+        self.windows = {} # Window ID -> Window, for the windows that are open
+        self.bridge = None
+        self.asset_servers = {} # (root, max_age) -> AssetServer
+
+        self.qt = None
+        self.invoker = None
+        self.scheme_handler = None
+        self.running = False # True while the Qt event loop runs
+
+    def start_loop(self):
+        # The loop lives as long as the process, the bridge and coroutine handlers run on it
+        with self.lock:
+            if self.loop_thread is None:
+                self.loop_thread = threading.Thread(target=self.run_loop, daemon=True)
+                self.loop_thread.start()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start_bridge(self, port):
+        # Started by the first window that uses the socket transport, on its sender_port
+        self.start_loop()
+        with self.lock:
+            if self.bridge is None:
+                self.bridge = Bridge(port, self.loop)
+                self.bridge.start()
+            return self.bridge
+
+    def asset_server(self, port, root, max_age):
+        # Windows serving the same directory share a server, the first server uses `port`, the others a free port
+        root = root or build.resource_path(".")
+        key = (os.path.realpath(root), max_age)
+        with self.lock:
+            server = self.asset_servers.get(key)
+            if server is None:
+                server = self.asset_servers[key] = start_listener_server(0 if self.asset_servers else port, root, max_age)
+            return server
+
+    def add(self, window):
+        with self.lock:
+            self.windows[window.window_id] = window
+
+    def remove(self, window):
+        with self.lock:
+            return self.windows.pop(window.window_id, None) is window
+
+    def start_qt(self):
+        # Must be called from the main thread
+        if self.qt is not None:
+            return self.qt
+
+        from PyQt6.QtCore import QObject, pyqtSignal
+        from PyQt6.QtWidgets import QApplication
+
+        # The scheme of the in-process transport must be registered before the QApplication is created
+        try:
+            from . import inprocess
+        except ImportError:
+            inprocess = None
+        if inprocess is not None and QApplication.instance() is None:
+            inprocess.register_scheme()
+
+        class Invoker(QObject):
+            # Runs functions on the thread it was created on, the main thread
+            call = pyqtSignal(object)
+
+            def __init__(self):
+                super().__init__()
+                self.call.connect(self.run)
+
+            def run(self, function):
+                try:
+                    function()
+                except Exception:
+                    logging.exception(f"Exception in {function}")
+
+        self.qt = QApplication.instance() or QApplication(sys.argv)
+        self.invoker = Invoker()
+        if inprocess is not None:
+            self.scheme_handler = inprocess.install_scheme_handler(self.scheme_root)
+        return self.qt
+
+    def scheme_root(self, window_id):
+        # Assets directory of a window for the neutron:// scheme, see Neutron/inprocess.py
+        window = self.windows.get(window_id)
+        if window is None:
+            return None
+        return os.path.realpath(window.assets or build.resource_path("."))
+
+    def invoke(self, function):
+        # Run `function` on the main thread, Qt objects can only be used there
+        if threading.current_thread() is threading.main_thread():
+            function()
+        else:
+            self.invoker.call.emit(function)
+
+    def run(self):
+        """
+        Run the application until the last window is closed, returns the exit code of Qt. Must be called from the main thread.
+        """
+        self.start_qt()
+        self.running = True
+        try:
+            return self.qt.exec()
+        finally:
+            self.running = False
+            # Windows still open when the application stopped, i.e after QApplication.quit()
+            for window in list(self.windows.values()):
+                window.closed()
+
+# Shared by every window of the process
+application = Application()
+
+def run():
+    # Run the windows opened with Window.open(), see Application.run()
+    return application.run()
+
+# QtWebEngine view started by prewarm(), used by the next window that is shown
+prewarmed_view = None
+
+def prewarm():
+    """
+    Start QtWebEngine (and its renderer process) ahead of `Window.show()`, i.e while the app is loading its data.\n
+    Must be called from the main thread.
+    """
+    global prewarmed_view
+    if prewarmed_view is not None:
+        return
+
+    from PyQt6.QtWebEngineWidgets import QWebEngineView
+
+    application.start_qt()
+    prewarmed_view = QWebEngineView()
+    prewarmed_view.setHtml("")
+
 class Window:
-    def __init__(self, title, css=None, position=(300, 300), size=(900, 600), listener_port=22943, sender_port=22944):
+    def __init__(self, title, css=None, position=(300, 300), size=(900, 600), listener_port=22943, sender_port=22944, instrument=False, trace_file=None, assets=None, assets_max_age=0, transport="socket", live_reload=False):
+        if transport not in ("socket", "qt"):
+            raise ValueError('transport must be "socket" or "qt"')
+
         self.title = title
+        self.window_id = f"w{next(application.window_ids)}"
         self.css = css
         self.position = position
         self.size = size
         self.running = False
 
+        # "socket" talks to the page over localhost servers, "qt" in process without opening any port
+        self.transport = transport
         self.listener_port = listener_port
+        # Directory the page loads its files from, relative URLs are resolved against the directory of the HTML file
+        self.assets = assets
+        self.assets_max_age = assets_max_age
+        self.asset_server = None
+        self.file = None
+        self.encoding = "utf-8"
         self.sender_port = sender_port
 
+        # Apply changes of the HTML and CSS files to the running page, see Neutron/reload.py
+        self.live_reload = live_reload
+        self.watcher = None
+
         self.view = None
         self.qt_window = None;
+        self.websocket_server = None
         self.html = ""
-        self.loop = asyncio.new_event_loop()
+        self.bridge_html = ""
+        self._document = None
+        # id -> NeutronID and tag name -> NeutronIDs of a loaded bundle, answers lookups until the document is parsed
+        self.bundle_index = None
+        # The event loop of the application, shared by every window. It runs on Application.loop_thread from the first
+        # window that is opened until the process exits
+        self.loop = application.loop
+        self.batches = threading.local()
+
+        # Runs the python functions called from the page, can be replaced before show()
+        self.dispatcher = Dispatcher()
+
+        # Encodes and decodes the messages of the bridge, can be replaced before show(), see Neutron/codec.py
+        self.codec = default_codec()
+
+        # Timings of the bridge, see Window.stats()
+        self.instrumentation = Stats(instrument, trace_file)
+
+        # Called once the page has connected, see Window.on_ready()
+        self.ready = threading.Event()
+        self.ready_callbacks = []
+        self.ready_lock = threading.Lock()
+
+        # Python functions the page can call, see Window.event()
+        self.handlers = Registry("h", on_release=self.handlers_collected)
 
+        # Properties of tracked elements kept in Python, see Window.mirror()
+        self.mirror_cache = Mirror(self)
 
-    def run_javascript(self, javascript):
+        # Bindings of reactive state, see Window.bind()
+        self.reactive = Updates(self)
+
+        # Milliseconds from the start of Window.show() to every startup phase
+        self.startup_timings = {}
+        self.show_started = None
+
+
+    def run_javascript(self, javascript, timeout=10, defer=True):
         if not self.running:
              raise RuntimeError(""""Window.run_javascript()" can only be called while the window is running!""")
 
-        message = json.dumps({"type": "eval", "javascript": javascript})
-        response = ""
-        async def send_and_wait():
-            nonlocal response
-            try:
-                response = await self.websocket_server.send_and_wait(message)
-            except TimeoutError:
-                raise TimeoutError("No response received within the timeout period.")
+        batch = self.current_batch()
+        if batch:
+            if defer:
+                return batch.add(javascript)
+            # The caller needs the value right away, send what is queued first to keep the order
+            batch.flush()
+
+        # The operation is the DOM method that called run_javascript (i.e getAttribute)
+        operation = sys._getframe(1).f_code.co_name if self.instrumentation.enabled else None
+        return self.websocket_server.send_and_wait(javascript, timeout, operation)
+
+    async def run_javascript_async(self, javascript, timeout=10):
+        if not self.running:
+             raise RuntimeError(""""Window.run_javascript_async()" can only be called while the window is running!""")
+
+        # Can be awaited on any event loop, the response is delivered by the loop of the application
+        operation = sys._getframe(1).f_code.co_name if self.instrumentation.enabled else None
+        future = asyncio.wrap_future(self.websocket_server.submit(javascript, operation))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("No response received within the timeout period.")
+
+    def run_javascript_batch(self, scripts, timeout=10):
+        if not self.running:
+             raise RuntimeError(""""Window.run_javascript_batch()" can only be called while the window is running!""")
+
+        return self.websocket_server.send_and_wait(batch_script(scripts), timeout, "batch")
+
+    def call(self, function, *args, timeout=10):
+        """
+        Call the JavaScript function `function` (a global name or a dotted path, i.e `"console.log"`) with `args` and return its result.\n
+        The arguments are sent as values (anything the codec can encode), they are never spliced into JavaScript source.
+        """
+        if not self.running:
+             raise RuntimeError(""""Window.call()" can only be called while the window is running!""")
+
+        # Keep the order of the scripts queued in a batch
+        batch = self.current_batch()
+        if batch:
+            batch.flush()
+
+        return self.websocket_server.wait(lambda: self.websocket_server.submit_call(function, args), timeout)
+
+    async def call_async(self, function, *args, timeout=10):
+        if not self.running:
+             raise RuntimeError(""""Window.call_async()" can only be called while the window is running!""")
+
+        future = asyncio.wrap_future(self.websocket_server.submit_call(function, args))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("No response received within the timeout period.")
+
+    def stats(self):
+        """
+        Returns a `dict` with the round trip latency per operation, the execution time and event count per bridge function,
+        the time calls waited in the queue, payload sizes, the state of the queue, the sizes of the function registry and the startup timings.
+        Timings of the bridge are only recorded if the window was created with `instrument=True`.
+        """
+        stats = self.instrumentation.summary()
+        stats["startup"] = dict(self.startup_timings)
+        stats["queue_depth"] = self.dispatcher.queue_depth
+        stats["dropped"] = self.dispatcher.dropped
+        stats["mirror"] = self.mirror_cache.summary()
+        stats["registry"] = self.handlers.summary()
+        if self.asset_server is not None:
+            stats["assets"] = self.asset_server.summary()
+        return stats
+
+    def send_buffer(self, name, data):
+        """
+        Send `data` (`bytes`, `bytearray`, `memoryview`, a NumPy array or any object supporting the buffer protocol) to the page
+        as a binary message, it is not copied or encoded.\n
+        The page receives it as a typed array matching its items (i.e a `Float32Array`), passed to the callbacks registered
+        with `neutronOnBuffer(name, callback)` and returned by `neutronBuffer(name)`.
+        Returns a `concurrent.futures.Future` that resolves once the page received it, `data` must not change until then.
+        """
+        if not self.running:
+             raise RuntimeError(""""Window.send_buffer()" can only be called while the window is running!""")
+
+        # Keep the order of the scripts queued in a batch
+        batch = self.current_batch()
+        if batch:
+            batch.flush()
+
+        return self.websocket_server.submit_buffer(name, data)
+
+    def write_trace(self, path=None):
+        self.instrumentation.write_trace(path)
+
+    def batch(self, timeout=10):
+        return Batch(self, timeout)
+
+    def current_batch(self):
+        stack = getattr(self.batches, "stack", None)
+        if stack is None:
+            stack = self.batches.stack = []
+        return stack[-1] if stack else None
+
+    def bind(self, element, state, value, property="textContent"):
+        """
+        Keep the `property` of `element` (an `HTMLelement` or an id) in sync with `state`.\n
+        `value` is the name of an attribute of the state or a function that is called with the state.
+        Changes are sent on the next tick, only if the value changed. Returns the `Binding`, call `unbind()` to stop.
+        """
+        return self.add_binding(Binding(self, self.bound_element(element), state, value, property))
+
+    def bind_list(self, element, state, items, key, template):
+        """
+        Render a row in `element` for every item of a list of `state`, in order.\n
+        `items` is the name of the list attribute of the state or a function that returns the items,
+        `key(item)` returns a unique key of the item and `template(item)` the HTML of its row.
+        When the list changes only the rows that were inserted, moved, removed or render differently are updated.
+        """
+        return self.add_binding(ListBinding(self, self.bound_element(element), state, items, key, template))
+
+    def bound_element(self, element):
+        if isinstance(element, str):
+            element_id, element = element, self.getElementById(element)
+            if element is None:
+                raise ValueError(f'HTMLelement with id "{element_id}" was not found!')
+        return element
+
+    def add_binding(self, binding):
+        binding.state._watch(binding.changed)
+        binding.changed()
+        return binding
+
+    def virtual_list(self, element, row_count, render_row, **options):
+        """
+        Turn `element` (an `HTMLelement` or an id) into a scrolling list of `row_count` rows that only renders the rows in view.\n
+        `render_row(index)` returns the HTML of a row, a single element of `row_height` pixels. Rows are fetched as the list scrolls.
+        The options are `row_height`, `overscan`, `page_size`, `cache_pages` and `prefetch`, see `VirtualList`.
+        """
+        virtual_list = VirtualList(self, self.bound_element(element), row_count, render_row, **options)
+        virtual_list.function_id = self.register_handler(virtual_list.fetch, virtual_list.element)
+        self.on_ready(virtual_list.start)
+        return virtual_list
+
+    def event(self, function, throttle_ms=None, debounce_ms=None, coalesce=None, owner=None, weak=False):
+        """
+        Same as `Neutron.event()` but the function is registered with this window.\n
+        With `owner` (an `HTMLelement`) the function is unregistered once the owner is removed from the page,
+        with `weak=True` only a weak reference is kept and the function is unregistered once it is garbage collected.
+        """
+        if not callable(function):
+            raise TypeError("Event attribute is not a function!")
+
+        limits = rate_limit(throttle_ms, debounce_ms, coalesce)
+        function_id = self.register_handler(function, owner, weak)
+        if owner is not None and self.running:
+            self.websocket_server.submit(f"neutronOwn({json.dumps([owner.NeutronID])});", "event")
+        return bridge_call(function_id, limits)
+
+    def bridge_call(self, function_id, limits=None):
+        return bridge_call(function_id, limits)
+
+    def register_handler(self, function, owner=None, weak=False):
+        return self.handlers.register(function, owner.NeutronID if owner is not None else None, weak)
+
+    def unregister(self, function):
+        """
+        Remove a function registered with `Window.event()`, `addEventListener()` or `display(pyfunctions=...)`.\n
+        Listeners added for it with `addEventListener()` are removed from the page.
+        """
+        function_id = self.handlers.unregister(function)
+        if function_id is not None:
+            self.handlers_collected([function_id])
+        return function_id is not None
+
+    def handler(self, function_id):
+        function = self.handlers.get(function_id)
+        if function is None:
+            function = shared_handlers.get(function_id)
+        return function
+
+    def handlers_collected(self, function_ids):
+        # Remove the listeners of functions that were unregistered or garbage collected, can be called from any thread.
+        # The garbage collector can call it on a thread that holds a lock of the bridge, the message is submitted from the loop
+        def unlisten():
+            if self.running and self.websocket_server is not None:
+                self.websocket_server.submit(f"neutronUnlisten({json.dumps(function_ids)});", "unregister")
+
+        if self.running:
+            self.loop.call_soon_threadsafe(unlisten)
+
+    def elements_released(self, NeutronIDs):
+        # Elements that owned functions were removed from the page
+        self.handlers.release(NeutronIDs)
+
+    def registry_sizes(self):
+        """
+        Returns the number of registered python functions and their owners, and while the window is running
+        the size of the registries of the page: elements with a NeutronID, listeners, owners, mirrored elements and virtual lists.
+        """
+        sizes = {"handlers": self.handlers.summary(), "shared_handlers": shared_handlers.summary()}
+        if self.running:
+            sizes["page"] = self.run_javascript("neutronRegistrySizes();", defer=False)
+        return sizes
+
+    def mirror(self, *elements, properties=None):
+        """
+        Keep a copy of the `properties` of `elements` (`HTMLelement`s or ids) in Python, reading them does not need a round trip.\n
+        By default `value`, `checked`, `className` (`classList`) and `innerHTML` are kept.
+        The page sends the properties whenever they change, use it for elements that are read often.
+        """
+        NeutronIDs = [self.bound_element(element).NeutronID for element in elements]
+        if self.running:
+            self.mirror_cache.track(NeutronIDs, properties)
+        else:
+            self.on_ready(lambda: self.mirror_cache.track(NeutronIDs, properties))
+
+    def unmirror(self, *elements):
+        self.mirror_cache.untrack([self.bound_element(element).NeutronID for element in elements])
+
+    def transaction(self):
+        """
+        Changes of reactive state made inside the block are sent together once it exits.\n
+        Bridge functions already run as a transaction.
+        """
+        return self.reactive.hold()
 
-        asyncio.run(send_and_wait())
-        return response
+    def display(self, file=None, html=None, pyfunctions=None, encoding="utf-8", bundle=None):
+        display_started = time.perf_counter()
 
-    def display(self, file=None, html=None, pyfunctions=None, encoding="utf-8"):
+        css = build.read(self.css, encoding) if self.css else None
 
+        self.file = file
+        self.encoding = encoding
         if file:
-            # Check if program is being run as an exe
-            if getattr(sys, 'frozen', False):
-                content = str(open(os.path.join(sys._MEIPASS, file), "r", encoding=encoding).read())
-            else:
-                content = str(open(file, "r", encoding=encoding).read())
+            bundle = bundle or file + build.BUNDLE_EXTENSION
+            try:
+                content = build.read(file, encoding)
+            except FileNotFoundError:
+                # Only the bundle was shipped
+                content = None
+
+            # Use the bundle made by "python -m Neutron build" if it was built from the same sources
+            loaded = build.load(bundle, content, css)
+            if loaded is None and content is None:
+                raise FileNotFoundError(f'"{file}" was not found!')
         elif html:
             content = str(html) # Make sure it is a string (could be beutifulsoup element)
-        
-        soup = BeautifulSoup(content, "html.parser")
+            loaded = None
+
+        if loaded:
+            self.html = loaded["html"]
+            elements.reserveNeutronIds(loaded["next_id"])
+            self._document = None # Only parsed if the document is used before show()
+            self.bundle_index = loaded["index"]
+        else:
+            from .document import Document
+            self._document = Document(build.process(content, css))
+            self.bundle_index = None
+
+        self.bridge_html = self.bridge_script(pyfunctions)
+        self.startup_timings["display"] = (time.perf_counter() - display_started) * 1000
 
+    def bridge_script(self, pyfunctions=None):
         bridge_html = """
         <script>
-        const commandSocket = new WebSocket("ws://localhost:""" + str(self.sender_port) + """");
+        const commandSocket = neutronTransport == "qt" ? neutronChannelSocket() : new WebSocket("ws://localhost:" + neutronBridgePort);
+        commandSocket.binaryType = "arraybuffer";
+
+        function neutronChannelSocket() {
+            // Window(transport="qt"), a QWebChannel behind the interface of a websocket, see Neutron/inprocess.py
+            const socket = {readyState: WebSocket.CONNECTING};
+            new QWebChannel(qt.webChannelTransport, function(channel) {
+                const neutron = channel.objects.neutron;
+                neutron.message.connect(function(message) {
+                    socket.onmessage({data: message[0] == "#" ? neutronFromBase64(message.slice(1)) : message});
+                });
+                socket.send = function(message) {
+                    neutron.receive(typeof message === "string" ? message : "#" + neutronToBase64(message));
+                };
+                socket.readyState = WebSocket.OPEN;
+                socket.onopen();
+            });
+            return socket;
+        };
+
+        function neutronToBase64(bytes) {
+            let binary = "";
+            for (let i = 0; i < bytes.length; i += 0x8000) {
+                binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+            }
+            return btoa(binary);
+        };
+
+        function neutronFromBase64(text) {
+            const binary = atob(text);
+            const bytes = new Uint8Array(binary.length);
+            for (let i = 0; i < binary.length; i++) {
+                bytes[i] = binary.charCodeAt(i);
+            }
+            return bytes.buffer;
+        };
+
+        // Messages sent before the connection is open are queued
+        const commandQueue = [];
+
+        function sendCommand(message) {
+            if (commandSocket.readyState === WebSocket.OPEN) {
+                commandSocket.send(message);
+            } else {
+                commandQueue.push(message);
+            }
+        };
 
         commandSocket.onopen = function() {
             console.log("WebSocket connection opened");
-            commandSocket.send("connect");
+            commandSocket.send("connect " + neutronWindow);
+            while (commandQueue.length) {
+                commandSocket.send(commandQueue.shift());
+            }
         };
 
         commandSocket.onmessage = function(event) {
+            if (typeof event.data !== "string") {
+                neutronReceiveBuffer(event.data);
+                return;
+            }
+
             data = JSON.parse(event.data);
-            if (data.type == "eval") {
-                result = eval(data.javascript);
-                commandSocket.send(result);
+            if (data.type == "eval" || data.type == "call") {
+                let reply;
+                try {
+                    result = data.type == "eval" ? eval(data.javascript) : neutronCall(data.function, data.args);
+                    reply = neutronResult(data.id, result);
+                } catch (error) {
+                    reply = neutronError(data.id, error);
+                }
+                // Changes of mirrored elements are sent before the reply
+                neutronMirrorFlush();
+                commandSocket.send(reply);
             }
         };
 
+        function neutronCall(path, args) {
+            // Window.call(), "console.log" is called with console as this
+            let owner = window;
+            const names = path.split(".");
+            for (const name of names.slice(0, -1)) {
+                owner = owner[name];
+            }
+            const func = owner[names[names.length - 1]];
+            if (typeof func !== "function") {
+                throw new TypeError(path + " is not a function");
+            }
+            return func.apply(owner, args);
+        };
+
+        function neutronReplacer(key, value) {
+            // Values JSON.stringify() would drop or turn into {}
+            if (typeof value === "bigint") {
+                return value.toString();
+            }
+            if (value instanceof Map) {
+                return Object.fromEntries(value);
+            }
+            if (value instanceof Set || value instanceof DOMTokenList) {
+                return Array.from(value);
+            }
+            if (value instanceof Node) {
+                return String(value);
+            }
+            return value;
+        };
+
+        function neutronResult(id, result) {
+            // Results are sent typed, results that can not be sent as JSON (i.e cyclic objects) as text
+            try {
+                return JSON.stringify({type: "result", id: id, result: result === undefined ? null : result}, neutronReplacer);
+            } catch (error) {
+                return JSON.stringify({type: "result", id: id, result: String(result)});
+            }
+        };
+
+        function neutronError(id, error) {
+            const isError = error instanceof Error;
+            return JSON.stringify({type: "error", id: id, error: {
+                name: isError ? error.name : "Error",
+                message: isError ? error.message : String(error),
+                stack: isError && error.stack ? error.stack : null
+            }});
+        };
+
         commandSocket.onclose = function() {
             console.log("WebSocket connection closed");
         };
@@ -188,23 +1025,707 @@ class Window:
         };
 
         function bridge(func, ...params) {
-            const url = 'http://localhost:""" + str(self.listener_port) + """';
-            const data = {
+            neutronBridgeSend(func, params, neutronEventSource());
+        };
+
+        function neutronEventSource() {
+            // NeutronID of the element the current event was fired on, used to keep the order of its events
+            const source = window.event && window.event.currentTarget;
+            return (source && source.nodeType === Node.ELEMENT_NODE) ? neutronId(source) : null;
+        };
+
+        function neutronBridgeSend(func, params, source) {
+            // ArrayBuffers and typed arrays are sent as binary, python functions receive them as memoryviews
+            const buffers = [];
+            const message = {
                 type: 'bridge',
                 function: func,
-                parameters: params
+                parameters: params.map(function(param) {
+                    if (param instanceof ArrayBuffer || ArrayBuffer.isView(param)) {
+                        buffers.push(param);
+                        return {__neutron_buffer__: buffers.length - 1};
+                    }
+                    return param;
+                }),
+                source: source
             };
 
-            fetch(url, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify(data),
-                })
-                .catch((error) => {
-                    console.error('Error:', error);
+            sendCommand(buffers.length ? neutronPack(message, buffers) : JSON.stringify(message));
+        };
+
+        // Binary messages, see Neutron/buffers.py
+        const neutronEncoder = new TextEncoder();
+        const neutronDecoder = new TextDecoder();
+        const neutronArrays = {
+            Int8Array, Int16Array, Int32Array, BigInt64Array,
+            Uint8Array, Uint16Array, Uint32Array, BigUint64Array,
+            Float32Array, Float64Array
+        };
+        const neutronBuffers = new Map(); // Name -> last typed array received
+        const neutronBufferCallbacks = new Map(); // Name -> callbacks
+
+        function neutronAlign(offset) {
+            return Math.ceil(offset / 8) * 8;
+        };
+
+        function neutronPack(header, buffers) {
+            // Header length, header, padding, then every buffer at a multiple of 8 bytes
+            const parts = [];
+            let offset = 0;
+            header.buffers = buffers.map(function(buffer) {
+                const bytes = ArrayBuffer.isView(buffer) ? new Uint8Array(buffer.buffer, buffer.byteOffset, buffer.byteLength) : new Uint8Array(buffer);
+                const start = neutronAlign(offset);
+                parts.push([start, bytes]);
+                offset = start + bytes.byteLength;
+                return [start, bytes.byteLength];
+            });
+
+            const json = neutronEncoder.encode(JSON.stringify(header));
+            const start = neutronAlign(4 + json.byteLength);
+            const message = new Uint8Array(start + offset);
+            new DataView(message.buffer).setUint32(0, json.byteLength, true);
+            message.set(json, 4);
+            for (const [offset, bytes] of parts) {
+                message.set(bytes, start + offset);
+            }
+            return message;
+        };
+
+        function neutronReceiveBuffer(buffer) {
+            const length = new DataView(buffer).getUint32(0, true);
+            const header = JSON.parse(neutronDecoder.decode(new Uint8Array(buffer, 4, length)));
+            const start = neutronAlign(4 + length);
+
+            let reply;
+            try {
+                // A view of the message, the data is not copied
+                const type = neutronArrays[header.array];
+                const data = new type(buffer, start, (buffer.byteLength - start) / type.BYTES_PER_ELEMENT);
+                neutronBuffers.set(header.name, data);
+                for (const callback of neutronBufferCallbacks.get(header.name) || []) {
+                    callback(data, header.shape);
+                }
+                reply = neutronResult(header.id, data.byteLength);
+            } catch (error) {
+                reply = neutronError(header.id, error);
+            }
+            neutronMirrorFlush();
+            commandSocket.send(reply);
+        };
+
+        function neutronOnBuffer(name, callback) {
+            // Call callback(data, shape) with every buffer sent by Window.send_buffer(name, ...)
+            if (!neutronBufferCallbacks.has(name)) {
+                neutronBufferCallbacks.set(name, []);
+            }
+            neutronBufferCallbacks.get(name).push(callback);
+        };
+
+        function neutronBuffer(name) {
+            return neutronBuffers.get(name);
+        };
+
+        // NeutronID -> element, so elements can be found without searching the document
+        const neutronElements = new Map();
+        let neutronIdCounter = 0;
+
+        function neutronIdOf(element) {
+            return element.getAttribute("data-nid");
+        };
+
+        function neutronId(element) {
+            if (!element) {
+                return "";
+            }
+
+            let id = neutronIdOf(element);
+
+            // Elements created in the page get their NeutronID here, uppercase so it never collides with one made by Python
+            if (id === null) {
+                id = "P" + (neutronIdCounter++).toString(36);
+                element.setAttribute("data-nid", id);
+            }
+
+            neutronElements.set(id, element);
+            return id;
+        };
+
+        function neutronElement(id) {
+            let element = neutronElements.get(id);
+            if (element === undefined) {
+                element = document.querySelector('[data-nid="' + id + '"]');
+                if (element !== null) {
+                    neutronElements.set(id, element);
+                }
+            }
+            return element;
+        };
+
+        function registerTree(node) {
+            if (node.nodeType === Node.ELEMENT_NODE) {
+                neutronId(node);
+                node.querySelectorAll("*").forEach(neutronId);
+            }
+        };
+
+        function unregisterTree(node) {
+            if (node.nodeType === Node.ELEMENT_NODE && !node.isConnected) {
+                for (const element of [node, ...node.querySelectorAll("*")]) {
+                    const id = neutronIdOf(element);
+                    if (id !== null && neutronElements.get(id) === element) {
+                        neutronElements.delete(id);
+                    }
+                    if (neutronMirrored.has(element)) {
+                        neutronMirrorChanged.add(element);
+                    }
+                    if (id !== null && neutronOwners.has(id)) {
+                        neutronOwners.delete(id);
+                        neutronListeners.delete(id);
+                        neutronVirtualLists.delete(id);
+                        neutronReleased.push(id);
+                    }
+                }
+            }
+        };
+
+        function neutronObserve(records) {
+            for (const record of records) {
+                record.removedNodes.forEach(unregisterTree);
+                record.addedNodes.forEach(registerTree);
+            }
+
+            // Python drops the functions owned by removed elements
+            if (neutronReleased.length) {
+                sendCommand(JSON.stringify({type: "released", elements: neutronReleased}));
+                neutronReleased = [];
+            }
+        };
+
+        function neutronSetCss(css) {
+            // Window.set_css(), the style made from the css file of the window is replaced in place
+            let style = document.head.querySelector("style[data-neutron-css]");
+            if (style === null) {
+                style = document.createElement("style");
+                style.setAttribute("data-neutron-css", "");
+                document.head.appendChild(style);
+            }
+            style.textContent = css;
+        };
+
+        function neutronUpdateHtml(html) {
+            // Window.update_html(), the document is changed to match the new HTML, nodes that still match are kept
+            const source = new DOMParser().parseFromString(html, "text/html");
+            neutronMorphChildren(document.head, source.head);
+            neutronMorph(document.body, source.body);
+        };
+
+        function neutronKept(node) {
+            // Scripts already ran and the CSS of the window is changed by Window.set_css(), they are left as they are
+            return node.nodeType === Node.ELEMENT_NODE && (node.nodeName === "SCRIPT" || node.hasAttribute("data-neutron-css"));
+        };
+
+        function neutronManaged(element) {
+            // Rows rendered by Window.bind_list() and Window.virtual_list() are not in the HTML, the container is left as it is
+            const id = neutronIdOf(element);
+            return neutronLists.has(element) || (id !== null && neutronVirtualLists.has(id)) ||
+                element.querySelector(":scope > [data-neutron-key]") !== null;
+        };
+
+        function neutronSameNode(node, source) {
+            // Elements with an id only match the element with the same id
+            return node.nodeName === source.nodeName && (node.nodeType !== Node.ELEMENT_NODE || node.id === source.id);
+        };
+
+        function neutronMorph(node, source) {
+            if (node.nodeType !== Node.ELEMENT_NODE) {
+                if (node.nodeValue !== source.nodeValue) {
+                    node.nodeValue = source.nodeValue;
+                }
+                return;
+            }
+            if (neutronManaged(node)) {
+                return;
+            }
+
+            // The NeutronID stays, Python may hold HTMLelements of the element
+            for (const name of node.getAttributeNames()) {
+                if (name !== "data-nid" && !source.hasAttribute(name)) {
+                    node.removeAttribute(name);
+                }
+            }
+            for (const name of source.getAttributeNames()) {
+                if (name !== "data-nid" && node.getAttribute(name) !== source.getAttribute(name)) {
+                    node.setAttribute(name, source.getAttribute(name));
+                }
+            }
+            neutronMorphChildren(node, source);
+        };
+
+        function neutronMorphChildren(parent, source) {
+            // Children are matched in order, a node that does not match is either removed or the new node is inserted before it
+            const next = function(node) {
+                while (node !== null && neutronKept(node)) {
+                    node = node.nextSibling;
+                }
+                return node;
+            };
+
+            let current = next(parent.firstChild);
+            for (const node of Array.from(source.childNodes)) {
+                if (neutronKept(node)) {
+                    continue;
+                }
+
+                if (current !== null && !neutronSameNode(current, node)) {
+                    const following = next(current.nextSibling);
+                    if (following !== null && neutronSameNode(following, node)) {
+                        current.remove();
+                        current = following;
+                    }
+                }
+
+                if (current !== null && neutronSameNode(current, node)) {
+                    neutronMorph(current, node);
+                    current = next(current.nextSibling);
+                } else {
+                    parent.insertBefore(document.importNode(node, true), current);
+                }
+            }
+
+            while (current !== null) {
+                const following = next(current.nextSibling);
+                current.remove();
+                current = following;
+            }
+        };
+
+        // Elements that own python functions, see Window.event(owner=...), and listeners added by Python
+        const neutronOwners = new Set();
+        const neutronListeners = new Map(); // NeutronID -> [[type, listener, function ID]]
+        let neutronReleased = [];
+
+        function neutronOwn(ids) {
+            for (const id of ids) {
+                neutronOwners.add(id);
+            }
+        };
+
+        function neutronListen(id, type, functionId, listener) {
+            const element = neutronElement(id);
+            element.addEventListener(type, listener);
+            if (!neutronListeners.has(id)) {
+                neutronListeners.set(id, []);
+            }
+            neutronListeners.get(id).push([type, listener, functionId]);
+            if (functionId !== null) {
+                neutronOwners.add(id);
+            }
+        };
+
+        function neutronUnlisten(functionIds, id, type) {
+            // Remove the listeners of the functions, of one element and event type if they are given
+            for (const [elementId, listeners] of (id === undefined ? neutronListeners : [[id, neutronListeners.get(id) || []]])) {
+                const element = neutronElement(elementId);
+                const kept = listeners.filter(function([listenerType, listener, functionId]) {
+                    if (functionIds.includes(functionId) && (type === undefined || type == listenerType)) {
+                        if (element) {
+                            element.removeEventListener(listenerType, listener);
+                        }
+                        return false;
+                    }
+                    return true;
                 });
+                if (kept.length) {
+                    neutronListeners.set(elementId, kept);
+                } else {
+                    neutronListeners.delete(elementId);
+                }
+            }
+        };
+
+        function neutronRegistrySizes() {
+            let listeners = 0;
+            for (const entries of neutronListeners.values()) {
+                listeners += entries.length;
+            }
+            return {
+                elements: neutronElements.size,
+                listeners: listeners,
+                owners: neutronOwners.size,
+                mirrored: neutronMirrored.size,
+                virtual_lists: neutronVirtualLists.size
+            };
+        };
+
+        const neutronObserver = new MutationObserver(neutronObserve);
+        neutronObserver.observe(document.documentElement, {childList: true, subtree: true});
+
+        // Mirror mode, see Neutron/mirror.py
+        const neutronMirrored = new Map(); // Element -> names of the mirrored properties
+        const neutronMirrorSent = new Map(); // Element -> last snapshot sent, as JSON
+        let neutronMirrorChanged = new Set();
+
+        const neutronMirrorObserver = new MutationObserver(function(records) {
+            neutronMirrorRecords(records);
+            neutronMirrorFlush();
+        });
+
+        function neutronMirrorRecords(records) {
+            for (const record of records) {
+                // The element itself or one of its descendants changed
+                for (let node = record.target; node; node = node.parentNode) {
+                    if (neutronMirrored.has(node)) {
+                        neutronMirrorChanged.add(node);
+                    }
+                }
+            }
+        };
+
+        function neutronSnapshot(element) {
+            if (!element.isConnected) {
+                return null;
+            }
+            const snapshot = {};
+            for (const property of neutronMirrored.get(element)) {
+                // Typed like the reads that go to the page, i.e checked is a boolean
+                const value = element[property];
+                snapshot[property] = (value === undefined) ? null : (value !== null && typeof value === "object") ? String(value) : value;
+            }
+            return snapshot;
+        };
+
+        function neutronMirrorTrack(ids, properties) {
+            const snapshots = {};
+            for (const id of ids) {
+                const element = neutronElement(id);
+                snapshots[id] = null;
+                if (element) {
+                    neutronMirrored.set(element, properties);
+                    neutronMirrorObserver.observe(element, {attributes: true, characterData: true, childList: true, subtree: true});
+                    snapshots[id] = neutronSnapshot(element);
+                    neutronMirrorSent.set(element, JSON.stringify(snapshots[id]));
+                }
+            }
+            return snapshots;
+        };
+
+        function neutronMirrorUntrack(ids) {
+            for (const id of ids) {
+                const element = neutronElement(id);
+                neutronMirrored.delete(element);
+                neutronMirrorSent.delete(element);
+                neutronMirrorChanged.delete(element);
+            }
+        };
+
+        function neutronMirrorFlush() {
+            if (!neutronMirrored.size) {
+                return;
+            }
+
+            neutronObserve(neutronObserver.takeRecords());
+            neutronMirrorRecords(neutronMirrorObserver.takeRecords());
+
+            // Properties such as value change without a mutation, compare them to what was sent
+            const elements = {};
+            for (const element of neutronMirrored.keys()) {
+                const changed = neutronMirrorChanged.has(element);
+                if (!changed && !("value" in element || "checked" in element)) {
+                    continue;
+                }
+                const snapshot = neutronSnapshot(element);
+                const json = JSON.stringify(snapshot);
+                if (changed || json !== neutronMirrorSent.get(element)) {
+                    elements[neutronIdOf(element)] = snapshot;
+                    neutronMirrorSent.set(element, json);
+                }
+                if (snapshot === null) {
+                    neutronMirrored.delete(element);
+                    neutronMirrorSent.delete(element);
+                }
+            }
+            neutronMirrorChanged = new Set();
+
+            if (Object.keys(elements).length) {
+                sendCommand(JSON.stringify({type: "mirror", elements: elements}));
+            }
+        };
+
+        // Changes made by the user
+        for (const type of ["input", "change"]) {
+            document.addEventListener(type, function(event) {
+                if (neutronMirrored.has(event.target)) {
+                    neutronMirrorChanged.add(event.target);
+                    neutronMirrorFlush();
+                }
+            }, true);
+        }
+
+        document.addEventListener("DOMContentLoaded", function() {
+            registerTree(document.documentElement);
+        });
+
+        // Rate limiting for Neutron.event(function, throttle_ms, debounce_ms, coalesce)
+        const bridgeLimiters = new Map();
+
+        function bridgeLimited(func, options, ...params) {
+            // Every element using the function is limited on its own, the event is gone once a timer flushes
+            const source = neutronEventSource();
+            const key = func + JSON.stringify(options) + source;
+            let limiter = bridgeLimiters.get(key);
+            if (!limiter) {
+                limiter = {payloads: [], timer: null, cleanup: null, last: 0, since: null};
+                bridgeLimiters.set(key, limiter);
+            }
+
+            if (options.coalesce == "all") {
+                limiter.payloads.push(params);
+            } else {
+                limiter.payloads = [params];
+            }
+
+            const now = Date.now();
+            if (limiter.since === null) {
+                limiter.since = now;
+            }
+
+            function flush() {
+                clearTimeout(limiter.timer);
+                limiter.timer = null;
+                limiter.last = Date.now();
+                limiter.since = null;
+
+                const payloads = limiter.payloads;
+                limiter.payloads = [];
+
+                // Only throttling needs the limiter again, to know when the last call was made,
+                // it is dropped once throttle_ms passed without another event
+                clearTimeout(limiter.cleanup);
+                if (options.throttle_ms === null) {
+                    bridgeLimiters.delete(key);
+                } else {
+                    limiter.cleanup = setTimeout(function() {
+                        if (limiter.timer === null && !limiter.payloads.length && bridgeLimiters.get(key) === limiter) {
+                            bridgeLimiters.delete(key);
+                        }
+                    }, options.throttle_ms);
+                }
+
+                if (!payloads.length) {
+                    return;
+                }
+
+                if (options.coalesce == "all") {
+                    neutronBridgeSend(func, [payloads], source);
+                } else {
+                    neutronBridgeSend(func, payloads[0], source);
+                }
+            };
+
+            if (options.debounce_ms !== null) {
+                // Wait for a pause, but never longer than throttle_ms if both are given
+                let wait = options.debounce_ms;
+                if (options.throttle_ms !== null) {
+                    wait = Math.min(wait, options.throttle_ms - (now - limiter.since));
+                }
+                clearTimeout(limiter.timer);
+                limiter.timer = setTimeout(flush, Math.max(wait, 0));
+            } else if (options.throttle_ms !== null) {
+                // Leading call, then at most one call every throttle_ms
+                const wait = options.throttle_ms - (now - limiter.last);
+                if (limiter.timer === null) {
+                    if (wait <= 0) {
+                        flush();
+                    } else {
+                        limiter.timer = setTimeout(flush, wait);
+                    }
+                }
+            } else if (limiter.timer === null) {
+                // Only coalesce was given, deliver the events queued until the next task together.
+                // Not requestAnimationFrame(), it does not run while the window is hidden or minimized
+                limiter.timer = setTimeout(flush, 0);
+            }
+        };
+
+        // Reactive updates sent by Python, see Neutron/reactive.py
+        const neutronLists = new WeakMap();
+
+        function neutronRows(list) {
+            // Key -> row of a list binding, rendered before the page loaded or by neutronPatch
+            let rows = neutronLists.get(list);
+            if (!rows) {
+                rows = new Map();
+                for (const row of list.children) {
+                    if (row.hasAttribute("data-neutron-key")) {
+                        rows.set(row.getAttribute("data-neutron-key"), row);
+                    }
+                }
+                neutronLists.set(list, rows);
+            }
+            return rows;
+        };
+
+        function neutronRow(html, key) {
+            const template = document.createElement("template");
+            template.innerHTML = html;
+            const row = template.content.firstElementChild;
+            row.setAttribute("data-neutron-key", key);
+            return row;
+        };
+
+        function neutronPatch(ops) {
+            for (const op of ops) {
+                const element = neutronElement(op[1]);
+                if (!element) {
+                    continue;
+                }
+
+                if (op[0] == "set") {
+                    element[op[2]] = op[3];
+                    continue;
+                }
+
+                const rows = neutronRows(element);
+                const before = (key) => (key === null ? null : rows.get(key) || null);
+
+                if (op[0] == "insert") {
+                    const row = neutronRow(op[3], op[2]);
+                    element.insertBefore(row, before(op[4]));
+                    rows.set(op[2], row);
+                } else if (op[0] == "move") {
+                    element.insertBefore(rows.get(op[2]), before(op[3]));
+                } else if (op[0] == "replace") {
+                    const row = neutronRow(op[3], op[2]);
+                    rows.get(op[2]).replaceWith(row);
+                    rows.set(op[2], row);
+                } else if (op[0] == "remove") {
+                    rows.get(op[2]).remove();
+                    rows.delete(op[2]);
+                }
+            }
+            return ops.length;
+        };
+
+        // Virtual lists, see Neutron/virtual.py
+        const neutronVirtualLists = new Map();
+
+        function neutronVirtualList(options) {
+            const container = neutronElement(options.id);
+            const list = Object.assign({
+                container: container,
+                pages: new Map(), // Page -> rows, least recently used first
+                requested: new Set(),
+                first: -1,
+                last: -1,
+                scrollTop: 0,
+                direction: 1,
+                frame: null
+            }, options);
+
+            container.innerHTML = "";
+            container.style.position = "relative";
+            container.style.overflowY = "auto";
+
+            list.spacer = document.createElement("div");
+            list.rows = document.createElement("div");
+            list.rows.style.position = "absolute";
+            list.rows.style.top = "0";
+            list.rows.style.left = "0";
+            list.rows.style.right = "0";
+            container.append(list.spacer, list.rows);
+
+            function scheduleRender() {
+                if (list.frame === null) {
+                    list.frame = requestAnimationFrame(function() {
+                        list.frame = null;
+                        neutronVirtualRender(list, false);
+                    });
+                }
+            };
+            container.addEventListener("scroll", scheduleRender, {passive: true});
+            new ResizeObserver(scheduleRender).observe(container);
+
+            neutronVirtualLists.set(options.id, list);
+            neutronVirtualReset(options.id, options.count, options.version);
+        };
+
+        function neutronVirtualReset(id, count, version) {
+            const list = neutronVirtualLists.get(id);
+            list.count = count;
+            list.version = version;
+            list.pages.clear();
+            list.requested.clear();
+            list.spacer.style.height = (count * list.row_height) + "px";
+            neutronVirtualRender(list, true);
+        };
+
+        function neutronVirtualRequest(list, page) {
+            if (page < 0 || page * list.page_size >= list.count) {
+                return;
+            }
+
+            const rows = list.pages.get(page);
+            if (rows) {
+                // Most recently used
+                list.pages.delete(page);
+                list.pages.set(page, rows);
+            } else if (!list.requested.has(page)) {
+                list.requested.add(page);
+                bridge(list.function, list.id, page, list.version);
+            }
+        };
+
+        function neutronVirtualRender(list, force) {
+            const top = list.container.scrollTop;
+            if (top != list.scrollTop) {
+                list.direction = top > list.scrollTop ? 1 : -1;
+                list.scrollTop = top;
+            }
+
+            const first = Math.max(0, Math.floor(top / list.row_height) - list.overscan);
+            const last = Math.min(list.count, Math.ceil((top + list.container.clientHeight) / list.row_height) + list.overscan);
+
+            // The pages in view, then the pages ahead of the scroll direction
+            const firstPage = Math.floor(first / list.page_size);
+            const lastPage = Math.floor(Math.max(last - 1, 0) / list.page_size);
+            for (let page = firstPage; page <= lastPage; page++) {
+                neutronVirtualRequest(list, page);
+            }
+            for (let n = 1; n <= list.prefetch; n++) {
+                neutronVirtualRequest(list, list.direction > 0 ? lastPage + n : firstPage - n);
+            }
+
+            if (!force && first == list.first && last == list.last) {
+                return;
+            }
+            list.first = first;
+            list.last = last;
+
+            const html = [];
+            for (let index = first; index < last; index++) {
+                const page = list.pages.get(Math.floor(index / list.page_size));
+                html.push(page ? page[index % list.page_size] : list.placeholder);
+            }
+            list.rows.style.transform = "translateY(" + (first * list.row_height) + "px)";
+            list.rows.innerHTML = html.join("");
+        };
+
+        function neutronVirtualPage(id, page, version, rows) {
+            const list = neutronVirtualLists.get(id);
+            if (!list || version != list.version) {
+                return;
+            }
+
+            list.requested.delete(page);
+            list.pages.set(page, rows);
+            while (list.pages.size > list.cache_pages) {
+                list.pages.delete(list.pages.keys().next().value);
+            }
+
+            // Only render again if the page is in view
+            if (page * list.page_size < list.last && (page + 1) * list.page_size > list.first) {
+                neutronVirtualRender(list, true);
+            }
         };
         """
         
@@ -212,139 +1733,364 @@ class Window:
         # add registered python function
         if pyfunctions:
             for function in pyfunctions:
-                api_functions.update({str(function): function})
-                bridge_html += "function " + function.__name__ +  "(...params){bridge('" + str(function) + "',...params)}; "
+                # Functions can be passed as (function, {"throttle_ms": ..., "debounce_ms": ..., "coalesce": ...})
+                limits = None
+                if isinstance(function, tuple):
+                    function, options = function
+                    limits = rate_limit(**options)
+
+                function_id = self.register_handler(function)
+                bridge_html += "function " + function.__name__ +  "(...params){" + bridge_call(function_id, limits, ",...params") + "}; "
 
         bridge_html += "</script>"
-        
-        # add the css 
-    
-        if self.css:
-            # Check if program is being run as an exe
-            if getattr(sys, 'frozen', False):
-                css = str(open(os.path.join(sys._MEIPASS, self.css), "r", encoding=encoding).read())
-            else:
-                css = str(open(self.css, "r", encoding=encoding).read())
-               
-            bridge_html += f"<style>{css}</style>"
-                
-        # Append the new HTML to the <head> section
 
-        if not soup.head:
-            head = soup.new_tag('head')
-            soup.insert(0, head)
+        return bridge_html
 
-        soup.head.append(BeautifulSoup(bridge_html, 'html.parser'))
+    @property
+    def document(self):
+        """
+        The parsed HTML of the window before it is shown. Everything done before `show()` is applied to it,
+        it is only serialized when the window is shown.
+        """
+        if self._document is None:
+            from bs4 import BeautifulSoup
+            from .document import Document
+            self._document = Document(BeautifulSoup(self.html, "html.parser"))
+            # The document can change from now on, lookups go through it
+            self.bundle_index = None
+        return self._document
+
+    def on_ready(self, callback):
+        """
+        Call `callback` once the page has loaded and connected to Python, DOM methods can be used from then on.\n
+        Called right away if the page is already connected. Can be used as a decorator.
+        """
+        with self.ready_lock:
+            if not self.ready.is_set():
+                self.ready_callbacks.append(callback)
+                return callback
+
+        self.dispatcher.submit(callback, [])
+        return callback
 
-        soupContent = soup.find_all()
+    def wait_ready(self, timeout=None):
+        # Block until the page has connected, returns False if it did not within `timeout` seconds
+        return self.ready.wait(timeout)
 
-        for element in soupContent:
-            elements.createNeutronId(element)
+    async def ready_async(self, timeout=None):
+        if not await asyncio.get_running_loop().run_in_executor(None, self.ready.wait, timeout):
+            raise TimeoutError("The page did not connect within the timeout period.")
 
-        # Link all filereads to the http server
-        base = soup.new_tag('base')
-        base['href'] = f"http://localhost:{self.listener_port}/"
+    def page_connected(self):
+        self.mark_startup("connected")
 
-        self.html = str(soup)
+        # Owners of functions registered before the page loaded
+        owners = self.handlers.owner_ids()
+        if owners:
+            self.websocket_server.submit(f"neutronOwn({json.dumps(owners)});", "event")
 
+        with self.ready_lock:
+            self.ready.set()
+            callbacks, self.ready_callbacks = self.ready_callbacks, []
+
+        for callback in callbacks:
+            self.dispatcher.submit(callback, [])
+
+    def mark_startup(self, phase):
+        if self.show_started is not None and phase not in self.startup_timings:
+            self.startup_timings[phase] = (time.perf_counter() - self.show_started) * 1000
 
     def show(self, after=None):
-        title = self.title
-        size = self.size
+        """
+        Show the window and run the application until the last window is closed, then exit.\n
+        While the application is already running (i.e called from a bridge function) the window is opened alongside the others.
+        """
+        self.open(after)
+        if application.running:
+            return
+
+        sys.exit(application.run())
+
+    def open(self, after=None):
+        """
+        Show the window without blocking.\n
+        While the application runs it can be called from any thread, before that only from the main thread,
+        then run the application with `Neutron.run()`.
+        """
+        if not application.running and threading.current_thread() is not threading.main_thread():
+            raise RuntimeError(""""Window.open()" can only be called from the main thread before the application runs!""")
 
-        # Start bridge server
-        server_thread = threading.Thread(target=start_listener_server, args=(self.listener_port,))
-        server_thread.daemon = True  # Ensures the thread will exit when the main program exits
-        server_thread.start()
+        self.show_started = time.perf_counter()
 
-        # Start websocket server
-        self.websocket_server = WebSocketSendServer(self.sender_port)
+        if after:
+            self.on_ready(after)
+
+        # Render the bindings made before show() into the document
+        if self.reactive.dirty:
+            self.reactive.flush()
+
+        if self._document is not None:
+            self.html = str(self._document)
+
+        if self.transport == "qt":
+            try:
+                from . import inprocess
+            except ImportError:
+                logging.warning("The in-process transport needs PyQt6.QtWebChannel, using the socket transport")
+                self.transport = "socket"
+
+        self.dispatcher.loop = self.loop
+        self.dispatcher.stats = self.instrumentation
+        self.dispatcher.hold = self.reactive.hold
+        channel_options = (self.dispatcher, self.instrumentation, self.page_connected, self.mirror_cache, self.handler, self.elements_released, self.codec)
+
+        if self.transport == "qt":
+            application.start_loop()
+            connection = f"<script>{inprocess.webchannel_script()}</script>" + self.connection_script()
+            self.websocket_server = QtChannel(self.window_id, *channel_options)
+        else:
+            # The servers are shared by every window, the first window starts them
+            self.asset_server = application.asset_server(self.listener_port, self.assets, self.assets_max_age)
+            bridge = application.start_bridge(self.sender_port)
+            connection = self.connection_script(bridge.port)
+            self.websocket_server = WebSocketSendServer(bridge, self.window_id, *channel_options)
+
+        html = build.inject(self.html, connection + self.bridge_html)
         self.websocket_server.start()
+        application.add(self)
+        self.watch_files()
+        self.mark_startup("servers_started")
+
+        application.invoke(lambda: self.create_view(html))
+
+    def connection_script(self, port=None):
+        # The transport and bridge the page connects to and the window it belongs to
+        return (f"<script>const neutronTransport = {json.dumps(self.transport)}; const neutronBridgePort = {json.dumps(port)}; "
+                f"const neutronWindow = {json.dumps(self.window_id)};</script>")
+
+    def create_view(self, html):
+        global prewarmed_view
+
+        from PyQt6.QtCore import Qt, QUrl
+        from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QWidget
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
+
+        title = self.title
+        size = self.size
 
         # Create window
-        app = QApplication(sys.argv)
+        application.start_qt()
+        self.mark_startup("qt_application")
 
         window = QMainWindow()
         window.setWindowTitle(title)
         window.setGeometry(100, 100, size[0], size[1])
 
+        # The view and its page are deleted with the window once it is closed
+        window.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        window.destroyed.connect(self.closed)
+
         central_widget = QWidget()
         layout = QVBoxLayout(central_widget)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
         window.setCentralWidget(central_widget)
 
-        view = QWebEngineView()
-        view.setHtml( self.html, QUrl("qrc:///"))
+        if prewarmed_view is not None:
+            view, prewarmed_view = prewarmed_view, None
+        else:
+            view = QWebEngineView()
+        view.loadFinished.connect(lambda ok: self.mark_startup("page_loaded"))
+        self.mark_startup("view_created")
+
+        # The page connects to the bridge as soon as it loads
+        if self.transport == "qt":
+            self.websocket_server.attach(view.page())
+        elif not self.websocket_server.bridge.listening.wait(10):
+            raise RuntimeError("The websocket server did not start!")
+
+        # DOM methods called from now on are queued until the page has connected
+        self.running = True
+        self.reactive.schedule()
+
+        view.setHtml(html, QUrl(self.base_url()))
+        self.mark_startup("page_loading")
 
         layout.addWidget(view)
 
         self.view = view
         self.qt_window = window;
 
-        self.running = True
         self.qt_window.show()
-        sys.exit(app.exec())
+        self.mark_startup("window_shown")
+
+    def closed(self, _=None):
+        # The window was closed, or the application stopped while it was open
+        if not application.remove(self):
+            return
+
+        self.running = False
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        self.websocket_server.close()
+        self.dispatcher.shutdown(wait=False)
+        self.view = None
+        self.qt_window = None
+
+        with self.ready_lock:
+            self.ready.clear()
+
+        if self.instrumentation.trace_file:
+            self.write_trace()
+
+    def base_url(self):
+        # URL of the directory of the HTML file on the asset server (or scheme), the root if the file is outside of it
+        directory = ""
+        if self.file:
+            root = application.scheme_root(self.window_id) if self.transport == "qt" else self.asset_server.root
+            directory = os.path.relpath(os.path.dirname(os.path.realpath(build.resource_path(self.file))), root)
+            if directory == "." or directory.startswith(".."):
+                directory = ""
+            else:
+                directory = urllib.parse.quote(directory.replace(os.sep, "/")) + "/"
+
+        if self.transport == "qt":
+            return f"neutron://{self.window_id}/{directory}"
+        return f"http://localhost:{self.asset_server.server_address[1]}/{directory}"
+
+    def set_css(self, file=None, css=None, encoding=None):
+        """
+        Replace the CSS of the window in place without reloading the page, i.e to switch themes.\n
+        Pass a CSS file, it becomes the `css` file of the window, or the CSS itself.
+        """
+        if not self.running:
+             raise RuntimeError(""""Window.set_css()" can only be called while the window is running!""")
+
+        if file:
+            css = build.read(file, encoding or self.encoding)
+            if file != self.css:
+                self.css = file
+                self.watch_files()
+
+        self.websocket_server.submit_call("neutronSetCss", [css or ""], "set_css")
+
+    def update_html(self, file=None, html=None, encoding=None):
+        """
+        Change the page to match new HTML (or an HTML file) without reloading it.\n
+        The page is diffed with the new HTML: elements that still match keep their NeutronID and their state, so existing
+        HTMLelements stay valid, the others are inserted or removed. The body and the head are updated, except for scripts,
+        which are not run again, the CSS of the window (see `Window.set_css()`) and the rows of `bind_list()` and `virtual_list()`.
+        """
+        if not self.running:
+             raise RuntimeError(""""Window.update_html()" can only be called while the window is running!""")
+
+        if file:
+            html = build.read(file, encoding or self.encoding)
+            if file != self.file:
+                self.file = file
+                self.watch_files()
+
+        self.websocket_server.submit_call("neutronUpdateHtml", [str(html)], "update_html")
 
+    def watch_files(self):
+        # Window(live_reload=True), the HTML and CSS files are watched again whenever they are replaced
+        if not self.live_reload:
+            return
+
+        if self.watcher is None:
+            self.watcher = FileWatcher()
+        self.watcher.clear()
+
+        if self.file:
+            self.watcher.watch(build.resource_path(self.file), lambda path: self.update_html(file=self.file))
+        if self.css:
+            self.watcher.watch(build.resource_path(self.css), lambda path: self.set_css(file=self.css))
 
     def close(self):
-        self.qt_window.close()
+        # Can be called from any thread, the application stops once the last window is closed
+        if self.qt_window is not None:
+            application.invoke(lambda: self.qt_window is not None and self.qt_window.close())
 
     def appendChild(self, html_element):
         if self.running:
-            self.run_javascript(f"""document.body.innerHTML += '{str(html_element)}';""")
-            html_element.domAttatched = True;
+            self.run_javascript(elements.append_script("document.body", html_element))
+            if isinstance(html_element, elements.HTMLelement):
+                html_element.domAttatched = True
             return html_element
         else:
             raise RuntimeError(""""Window.appendChild()" can only be called while the window is running!""")
 
     def append(self, html):
         if self.running:
-            self.run_javascript(f"""document.body.innerHTML += '{str(html)}';""")
+            self.run_javascript(elements.append_script("document.body", html))
         else:
             raise RuntimeError(""""Window.append()" can only be called while the window is running!""")
 
+    def append_many(self, htmls):
+        """
+        Appends every HTML string of `htmls` to the body, in a single message and a single parse of the page.
+        """
+        self.append("".join(str(html) for html in htmls))
+
     def getElementById(self, id):
         if self.running:
-            elementNeutronID = str(self.run_javascript(f""" '' + document.getElementById("{id}").className;"""))
-
-            NeutronID = None
-
-            for classname in elementNeutronID.split(' '):
-                if "NeutronID_" in classname:
-                    NeutronID = classname
-                    break
+            NeutronID = self.run_javascript(f"""neutronId(document.getElementById({json.dumps(id)}));""", defer=False)
 
+            if NeutronID:
+                return elements.HTMLelement(self, NeutronID, None, True)
+            else:
+                logging.warning(f'HTMLelement with id "{id}" was not found!')
+                return None
+        elif self.bundle_index is not None:
+            # Answered from the bundle without parsing the document
+            NeutronID = self.bundle_index["ids"].get(id)
             if NeutronID:
                 return elements.HTMLelement(self, NeutronID, None, True)
             else:
                 logging.warning(f'HTMLelement with id "{id}" was not found!')
                 return None
         else:
-            soup = BeautifulSoup(self.html, "html.parser")
             # check if element exists
-            element = soup.select(f'#{id}')
-            if element != []:
-                NeutronID = element[0].get('class')[0]
+            element = self.document.getElementById(id)
+            if element is not None:
+                NeutronID = elements.getNeutronId(element)
                 return elements.HTMLelement(self, NeutronID, element, True)
             else:
                 logging.warning(f'HTMLelement with id "{id}" was not found!')
                 return None
 
+    async def getElementById_async(self, id):
+        if self.running:
+            NeutronID = await self.run_javascript_async(f"""neutronId(document.getElementById({json.dumps(id)}));""")
+
+            if NeutronID:
+                return elements.HTMLelement(self, NeutronID, None, True)
+            else:
+                logging.warning(f'HTMLelement with id "{id}" was not found!')
+                return None
+        else:
+            return self.getElementById(id)
+
     def getElementsByTagName(self, name):
         if self.running:
-            ElementsNeutronID = self.run_javascript("var elementsNeutronID = []; Array.from(document.getElementsByTagName('" + name + "')).forEach(function(item) { elementsNeutronID.push(item.className) }); '' + elementsNeutronID;")
-            return [elements.HTMLelement(self, NeutronID.split(' ')[0], None, True) for NeutronID in ElementsNeutronID.split(",")]
+            ElementsNeutronID = self.run_javascript(f"Array.from(document.getElementsByTagName({json.dumps(name)}), neutronId);", defer=False)
+            return elements.HTMLCollection(self, [elements.HTMLelement(self, NeutronID, None, True) for NeutronID in ElementsNeutronID])
+        elif self.bundle_index is not None:
+            return elements.HTMLCollection(self, [elements.HTMLelement(self, NeutronID, None, True) for NeutronID in self.bundle_index["tags"].get(name, [])])
+        else:
+            return elements.HTMLCollection(self, [elements.HTMLelement(self, elements.getNeutronId(element), element, True) for element in self.document.getElementsByTagName(name)])
+
+    async def getElementsByTagName_async(self, name):
+        if self.running:
+            ElementsNeutronID = await self.run_javascript_async(f"Array.from(document.getElementsByTagName({json.dumps(name)}), neutronId);")
+            return elements.HTMLCollection(self, [elements.HTMLelement(self, NeutronID, None, True) for NeutronID in ElementsNeutronID])
         else:
-            soup = BeautifulSoup(self.html, "html.parser")
-            return [elements.HTMLelement(self, element.get('class')[0], element, True) for element in soup.find_all(name)]
+            return self.getElementsByTagName(name)
 
     def createElement(self, tag):
-        soup = BeautifulSoup(self.html, features="html.parser")
-        elem = soup.new_tag(tag)
+        elem = self.document.new_tag(tag)
 
         NeutronID = elements.createNeutronId(elem)
 
-        soup.append(elem)
-
         return elements.HTMLelement(self, NeutronID, elem, False)
@@ -0,0 +1,31 @@
+import argparse
+
+from . import build
+
+"""
+
+Command line tools of Neutron.
+
+    python -m Neutron build render.html --css def.css
+
+"""
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m Neutron")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="process an HTML file ahead of time, Window.display() loads the bundle instead of the HTML file")
+    build_parser.add_argument("file", help="the HTML file passed to Window.display()")
+    build_parser.add_argument("--css", help="the CSS file passed to Window()")
+    build_parser.add_argument("--output", "-o", help=f"path of the bundle, by default FILE{build.BUNDLE_EXTENSION}")
+    build_parser.add_argument("--encoding", default="utf-8")
+
+    arguments = parser.parse_args()
+
+    if arguments.command == "build":
+        output = build.build(arguments.file, arguments.css, arguments.output, arguments.encoding)
+        print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
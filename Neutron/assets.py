@@ -0,0 +1,214 @@
+import collections
+import email.utils
+import mimetypes
+import os
+import posixpath
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""
+
+The asset server serves the files the page loads (images, fonts, scripts...) from the assets directory of the window,
+the current directory or the bundle directory of a frozen app (sys._MEIPASS) by default.
+Every request is handled on its own thread over keep-alive connections. Responses carry an ETag so the page can revalidate
+with a 304 response, small files are kept in an LRU cache in memory, a precompressed "file.gz" next to a file is sent
+to clients that accept gzip, large files are sent with sendfile() and single byte ranges are supported for media.
+
+"""
+
+class AssetCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_file_bytes=256 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.size = 0
+        self.files = collections.OrderedDict() # (path, mtime, size) -> content, least recently used first
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            content = self.files.get(key)
+            if content is not None:
+                self.files.move_to_end(key)
+            return content
+
+    def put(self, key, content):
+        if len(content) > self.max_file_bytes:
+            return
+        with self.lock:
+            if key in self.files:
+                return
+            self.files[key] = content
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, evicted = self.files.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class AssetServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, root, max_age=0, cache=None):
+        super().__init__(address, AssetHandler)
+        self.root = os.path.realpath(root)
+        self.max_age = max_age # Seconds the page may use a file without revalidating it
+        self.cache = cache or AssetCache()
+        self.counters = collections.Counter()
+        self.counters_lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self.counters_lock:
+            self.counters[name] += value
+
+    def summary(self):
+        with self.counters_lock:
+            return dict(self.counters)
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, every response has a Content-Length
+
+    def log_message(self, format, *args):
+        # Disable log messages
+        pass
+
+    def do_HEAD(self):
+        self.serve(head=True)
+
+    def do_GET(self):
+        self.serve(head=False)
+
+    def serve(self, head):
+        path = resolve(self.server.root, urllib.parse.unquote(urllib.parse.urlsplit(self.path).path))
+        if path is None or not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return
+
+        # Use the precompressed variant when the client accepts it, ranges always refer to the file itself
+        ranged = "Range" in self.headers
+        encoding = None
+        if not ranged and "gzip" in self.headers.get("Accept-Encoding", "") and os.path.isfile(path + ".gz"):
+            encoding = "gzip"
+
+        file_path = path + ".gz" if encoding else path
+        stat = os.stat(file_path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-gz" if encoding else ""}"'
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": email.utils.formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": f"max-age={self.server.max_age}" if self.server.max_age else "no-cache",
+            "Accept-Ranges": "bytes",
+            "Vary": "Accept-Encoding",
+        }
+
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.server.count("not_modified")
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        size = stat.st_size
+        start, end = 0, size - 1
+        status = 200
+        if ranged:
+            byte_range = self.byte_range(size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if byte_range is not False:
+                start, end = byte_range
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        length = max(end - start + 1, 0)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+        if head:
+            return
+
+        self.server.count("requests")
+        self.server.count("bytes_sent", length)
+
+        # Small files come from the cache, the key changes whenever the file does
+        if size <= self.server.cache.max_file_bytes:
+            content, hit = read_cached(self.server.cache, file_path, stat)
+            self.server.count("cache_hits" if hit else "cache_misses")
+            self.wfile.write(content[start:end + 1])
+            return
+
+        # Large files go from the file to the socket without passing through Python (sendfile where available)
+        self.wfile.flush()
+        with open(file_path, "rb") as file:
+            self.connection.sendfile(file, start, length)
+
+    def byte_range(self, size):
+        # Returns (start, end), False to ignore the header (i.e several ranges) or None if it can not be satisfied
+        unit, _, ranges = self.headers["Range"].partition("=")
+        if unit.strip() != "bytes" or "," in ranges:
+            return False
+
+        first, _, last = ranges.strip().partition("-")
+        try:
+            if first == "":
+                length = int(last)
+                if length <= 0:
+                    return None
+                return max(size - length, 0), size - 1
+            start = int(first)
+            end = int(last) if last else size - 1
+        except ValueError:
+            return False
+
+        if start >= size or end < start:
+            return None
+        return start, min(end, size - 1)
+
+
+def resolve(root, path):
+    # Path of the file at the URL path `path` inside `root` (a real path), None if it points outside of it
+    path = posixpath.normpath(path).lstrip("/")
+    full_path = os.path.realpath(os.path.join(root, *path.split("/")))
+    if full_path != root and not full_path.startswith(root + os.sep):
+        return None
+    if os.path.isdir(full_path):
+        full_path = os.path.join(full_path, "index.html")
+    return full_path
+
+
+def read_cached(cache, path, stat):
+    # Contents of a small file, from the cache if it did not change since
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    content = cache.get(key)
+    if content is None:
+        with open(path, "rb") as file:
+            content = file.read()
+        cache.put(key, content)
+        return content, False
+    return content, True
+
+
+def start_asset_server(port, root, max_age=0, cache=None):
+    # The port is bound before returning, so the page can be loaded right away
+    server = AssetServer(('localhost', port), root, max_age, cache)
+
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.daemon = True # Ensures the thread will exit when the main program exits
+    server_thread.start()
+
+    return server
@@ -0,0 +1,98 @@
+import json
+
+"""
+
+A batch queues JavaScript on the Python side and ships it to the page as a single message.
+The queued scripts run in order, every read returns a BatchResult that is filled in once the batch is sent.
+Use it through Window.batch(), either as a context manager or by calling send() yourself.
+
+"""
+
+class BatchResult:
+    def __init__(self):
+        self.done = False
+        self._value = None
+
+    @property
+    def value(self):
+        if not self.done:
+            raise RuntimeError("The batch this result belongs to has not been sent yet!")
+        return self._value
+
+    def resolve(self, value):
+        self._value = value
+        self.done = True
+
+    def __str__(self):
+        return str(self.value)
+
+    def __repr__(self):
+        return f"BatchResult({self._value!r})" if self.done else "BatchResult(<pending>)"
+
+
+class Batch:
+    def __init__(self, window, timeout=10):
+        self.window = window
+        self.timeout = timeout
+        self.scripts = []
+        self.results = []
+        self.parent = None
+
+    def add(self, javascript) -> BatchResult:
+        # Nested batches join the outermost one so the order of operations is kept
+        if self.parent:
+            return self.parent.add(javascript)
+
+        result = BatchResult()
+        self.scripts.append(javascript)
+        self.results.append(result)
+        return result
+
+    def send(self) -> list:
+        if self.parent:
+            return []
+
+        scripts, results = self.scripts, self.results
+        self.scripts, self.results = [], []
+
+        if not scripts:
+            return []
+
+        values = self.window.run_javascript_batch(scripts, self.timeout)
+        for result, value in zip(results, values):
+            result.resolve(value)
+
+        return values
+
+    def root(self):
+        # Nested batches queue into the outermost one
+        batch = self
+        while batch.parent:
+            batch = batch.parent
+        return batch
+
+    def flush(self) -> list:
+        # Send what is queued right away, i.e before a read
+        return self.root().send()
+
+    def __enter__(self):
+        self.parent = self.window.current_batch()
+        self.window.batches.stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.window.batches.stack.remove(self)
+
+        # Drop the queued operations if the block raised
+        if exc_type is None:
+            self.send()
+        else:
+            self.scripts, self.results = [], []
+
+        self.parent = None
+
+
+def batch_script(scripts) -> str:
+    # Every script is evaluated on its own so that a script can still end with a ";"
+    # Results are typed, undefined is sent as null
+    return json.dumps(scripts) + ".map(function(script) { return eval(script); });"
@@ -0,0 +1,104 @@
+import json
+import sys
+
+"""
+
+Binary messages carry bytes between Python and the page without base64 or splicing them into JavaScript source.
+A binary message is sent as one websocket message: the length of a JSON header (4 bytes, little endian), the header,
+padding up to a multiple of 8 bytes and the data, so the page can view the data as a typed array without copying it.
+Python sends one buffer per message, Window.send_buffer(), the page sends the buffers passed to bridge() as arguments.
+Their offsets and lengths (from the end of the header) are in the header, handlers receive them as read-only memoryviews.
+
+"""
+
+# (kind, item size) -> typed array used by the page, other formats are sent as bytes (Uint8Array)
+TYPED_ARRAYS = {
+    ("i", 1): "Int8Array",
+    ("i", 2): "Int16Array",
+    ("i", 4): "Int32Array",
+    ("i", 8): "BigInt64Array",
+    ("u", 1): "Uint8Array",
+    ("u", 2): "Uint16Array",
+    ("u", 4): "Uint32Array",
+    ("u", 8): "BigUint64Array",
+    ("f", 4): "Float32Array",
+    ("f", 8): "Float64Array",
+}
+
+# Replaces a buffer in the parameters of a bridge call, the number is the index of the buffer in the header
+PLACEHOLDER = "__neutron_buffer__"
+
+ALIGNMENT = 8
+
+
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def typed_array(view):
+    # Name of the typed array that matches the items of a memoryview
+    format = view.format
+    if format[0] in "<>!=@":
+        # Typed arrays use the byte order of the machine
+        if {"<": "little", ">": "big", "!": "big"}.get(format[0], sys.byteorder) != sys.byteorder:
+            return "Uint8Array"
+        format = format[1:]
+
+    if format in ("b", "h", "i", "l", "q", "n"):
+        kind = "i"
+    elif format in ("B", "H", "I", "L", "Q", "N", "c", "?"):
+        kind = "u"
+    elif format in ("f", "d"):
+        kind = "f"
+    else:
+        return "Uint8Array"
+    return TYPED_ARRAYS.get((kind, view.itemsize), "Uint8Array")
+
+
+def pack(header, data):
+    """
+    Returns the binary message for `header` (a `dict`) and `data` (any object supporting the buffer protocol) as a list
+    of fragments, the data is not copied unless it is not contiguous. `header` gets the typed array and shape of the data.
+    """
+    view = memoryview(data)
+    header["array"] = typed_array(view)
+    header["shape"] = list(view.shape)
+
+    if view.c_contiguous:
+        data = view.cast("B")
+    else:
+        data = memoryview(view.tobytes())
+
+    encoded = json.dumps(header).encode()
+    start = align(4 + len(encoded))
+    prefix = len(encoded).to_bytes(4, "little") + encoded + bytes(start - 4 - len(encoded))
+    return [prefix, data]
+
+
+def unpack(message):
+    # Returns the header and the data of a binary message, the data is a view of the message
+    view = memoryview(message)
+    length = int.from_bytes(view[:4], "little")
+    header = json.loads(bytes(view[4:4 + length]))
+    return header, view[align(4 + length):]
+
+
+def unpack_call(message):
+    # A bridge call with buffers, returns it with the buffers in place of their placeholders
+    header, data = unpack(message)
+    buffers = [data[offset:offset + length] for offset, length in header.pop("buffers", [])]
+
+    def replace(value):
+        if isinstance(value, dict) and len(value) == 1 and PLACEHOLDER in value:
+            return buffers[value[PLACEHOLDER]]
+        return value
+
+    header["parameters"] = [replace(value) for value in header.get("parameters", [])]
+    return header
+
+
+def size(message):
+    # Bytes of a text message or of the fragments of a binary message
+    if isinstance(message, list):
+        return sum(memoryview(fragment).nbytes for fragment in message)
+    return len(message)
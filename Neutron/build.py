@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sys
+
+from . import elements
+
+"""
+
+Ahead of time processing of the HTML and CSS of a window.
+display() parses the HTML, gives every element a NeutronID and inlines the CSS. The result only depends on the
+source files, so `python -m Neutron build` can do it once and save it as a bundle next to the HTML file.
+display() loads the bundle as is (without importing bs4) as long as the content hash of the sources matches,
+otherwise it processes the sources again.
+The bridge script depends on the window (ports, python functions), it is inserted at the BRIDGE_MARKER when the window is shown.
+
+"""
+
+BUNDLE_VERSION = 3
+BUNDLE_EXTENSION = ".neutron"
+BRIDGE_MARKER = "<!--neutron-bridge-->"
+# Marks the style made from the css file of the window, Window.set_css() replaces it
+CSS_ATTRIBUTE = "data-neutron-css"
+
+
+def resource_path(path):
+    # Check if program is being run as an exe
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, path)
+    return path
+
+
+def read(path, encoding="utf-8"):
+    with open(resource_path(path), "r", encoding=encoding) as file:
+        return file.read()
+
+
+def source_hash(content, css=None):
+    digest = hashlib.sha256()
+    for part in (str(BUNDLE_VERSION), content, css or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def process(content, css=None):
+    """
+    Parse the HTML, give every element a NeutronID, inline the CSS and mark where the bridge script goes.\n
+    Returns the `BeautifulSoup` of the document.
+    """
+    from bs4 import BeautifulSoup, Comment
+
+    soup = BeautifulSoup(content, "html.parser")
+
+    if not soup.head:
+        head = soup.new_tag('head')
+        (soup.html or soup).insert(0, head)
+
+    if css:
+        style = soup.new_tag('style')
+        style[CSS_ATTRIBUTE] = ""
+        style.string = css
+        soup.head.append(style)
+
+    for element in soup.find_all():
+        elements.createNeutronId(element)
+
+    # The bridge script comes first so scripts in the head can use it
+    soup.head.insert(0, Comment(BRIDGE_MARKER[4:-3]))
+
+    return soup
+
+
+def index(soup):
+    # id -> NeutronID and tag name -> NeutronIDs, in document order
+    ids = {}
+    tags = {}
+    for element in soup.find_all():
+        NeutronID = elements.getNeutronId(element)
+        tags.setdefault(element.name, []).append(NeutronID)
+        if element.get('id') is not None:
+            ids.setdefault(element['id'], NeutronID)
+    return {"ids": ids, "tags": tags}
+
+
+def build(file, css=None, output=None, encoding="utf-8"):
+    """
+    Process `file` (and the `css` file) and write the bundle to `output`, by default `file` + ".neutron".\n
+    Returns the path of the bundle.
+    """
+    content = read(file, encoding)
+    css_content = read(css, encoding) if css else None
+
+    soup = process(content, css_content)
+
+    bundle = {
+        "version": BUNDLE_VERSION,
+        "hash": source_hash(content, css_content),
+        "html": str(soup),
+        "index": index(soup),
+        # NeutronIDs given out after loading the bundle start here
+        "next_id": max((int(elements.getNeutronId(element), 36) + 1 for element in soup.find_all()), default=0),
+    }
+
+    output = output or file + BUNDLE_EXTENSION
+    with open(output, "w", encoding="utf-8") as bundle_file:
+        json.dump(bundle, bundle_file)
+
+    return output
+
+
+def load(path, content=None, css=None):
+    """
+    Returns the bundle at `path`, or `None` if there is no bundle or it was built from different sources.\n
+    Pass `content` as `None` if the sources are not available, the bundle is then used as is.
+    """
+    path = resource_path(path)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as bundle_file:
+        bundle = json.load(bundle_file)
+
+    if bundle.get("version") != BUNDLE_VERSION:
+        return None
+    if content is not None and bundle["hash"] != source_hash(content, css):
+        return None
+
+    return bundle
+
+
+def inject(html, script):
+    # Insert the bridge script at the marker, documents without one get it at the start
+    if BRIDGE_MARKER in html:
+        return html.replace(BRIDGE_MARKER, script, 1)
+    return script + html
@@ -0,0 +1,49 @@
+import json
+
+"""
+
+The codec encodes the messages Python sends to the page and decodes the messages the page sends back.
+The page encodes and decodes with JSON.stringify() and JSON.parse(), which are native and faster than any decoder
+written in JavaScript, so every codec speaks JSON and codecs only differ in their Python implementation:
+orjson when it is installed, the json module otherwise.
+Results of the page are typed (numbers, booleans, lists, dicts, None), a codec decodes them once along with the message.
+
+"""
+
+class JSONCodec:
+    name = "json"
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(default=str, ensure_ascii=False, separators=(",", ":"))
+        self.decoder = json.JSONDecoder()
+
+    def dumps(self, value) -> str:
+        return self.encoder.encode(value)
+
+    def loads(self, message):
+        return self.decoder.decode(message)
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def dumps(self, value) -> str:
+        # Text messages must be str, orjson returns bytes
+        return self.orjson.dumps(value, default=str).decode()
+
+    def loads(self, message):
+        return self.orjson.loads(message)
+
+
+def default_codec():
+    """
+    Returns the fastest codec that is installed.
+    """
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JSONCodec()
@@ -0,0 +1,177 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import inspect
+import logging
+import threading
+import time
+
+"""
+
+The Dispatcher runs the python functions called from the page (bridge calls) on a pool of threads,
+so one slow function does not block the other events of the window.
+Calls with the same ordering key (the function, or the element the event came from) still run one at a time in FIFO order.
+The number of calls waiting to run is bounded, when the queue is full calls are dropped according to the drop policy.
+Coroutine functions (async def) run on the event loop of the application, shared by every window.
+
+"""
+
+def cpu_bound(function):
+    """
+    Decorator for functions that should run in a separate process instead of a thread.\n
+    The function and its parameters must be picklable, its return value is discarded.
+    """
+    function.cpu_bound = True
+    return function
+
+
+class Call:
+    def __init__(self, function, params, key, function_id=None):
+        self.function = function
+        self.function_id = function_id
+        self.params = params
+        self.key = key
+        self.dropped = False
+        self.queued = time.perf_counter()
+
+
+class Dispatcher:
+    def __init__(self, max_workers=4, max_queue=10000, drop_policy="drop_oldest", ordering="handler", max_processes=None):
+        if drop_policy not in ("drop_oldest", "drop_newest"):
+            raise ValueError('drop_policy must be "drop_oldest" or "drop_newest"')
+        if ordering not in ("handler", "element", None):
+            raise ValueError('ordering must be "handler", "element" or None')
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.drop_policy = drop_policy
+        self.ordering = ordering
+        self.max_processes = max_processes
+
+        self.dropped = 0
+        self.full = False
+        self.queued = collections.deque() # Calls that have not started yet, oldest first
+        self.lanes = {} # Ordering key -> calls waiting for the running call with the same key
+        self.lock = threading.Lock()
+
+        self.threads = None
+        self.processes = None
+        self.loop = None # Coroutine functions run on this loop, set by the window
+        self.stats = None # Stats of the window, set by the window
+        self.hold = None # Delays the reactive updates made by a call until it returns, set by the window
+
+    @property
+    def queue_depth(self):
+        with self.lock:
+            return len(self.queued)
+
+    def submit(self, function, params, source=None, function_id=None):
+        # `function_id` is the ID of a registered function, its stats are kept under it
+        if self.ordering == "element" and source:
+            key = source
+        elif self.ordering is not None:
+            key = function
+        else:
+            key = None
+
+        call = Call(function, params, key, function_id)
+
+        with self.lock:
+            if len(self.queued) >= self.max_queue:
+                # Only warn once every time the queue fills up
+                if not self.full:
+                    logging.warning(f"Bridge queue is full ({self.max_queue} calls), calls are being dropped")
+                self.full = True
+                self.dropped += 1
+
+                if self.drop_policy == "drop_newest":
+                    return
+                self.queued.popleft().dropped = True
+            else:
+                self.full = False
+
+            self.queued.append(call)
+
+            if key is not None and key in self.lanes:
+                # A call with the same key is running, it picks this one up when it is done
+                self.lanes[key].append(call)
+                return
+            if key is not None:
+                self.lanes[key] = collections.deque()
+
+            if self.threads is None:
+                self.threads = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix="Neutron")
+            # shutdown() can swap the pool out as soon as the lock is released
+            threads = self.threads
+
+        try:
+            threads.submit(self.run_lane, call)
+        except RuntimeError:
+            # The pool was shut down in the meantime, the window closed
+            with self.lock:
+                if call in self.queued:
+                    self.queued.remove(call)
+                if key is not None:
+                    self.lanes.pop(key, None)
+
+    def run_lane(self, call):
+        while call is not None:
+            with self.lock:
+                started = not call.dropped
+                if started:
+                    self.queued.remove(call)
+
+            if started:
+                self.run(call)
+
+            with self.lock:
+                if call.key is None:
+                    return
+                lane = self.lanes[call.key]
+                if lane:
+                    call = lane.popleft()
+                else:
+                    del self.lanes[call.key]
+                    call = None
+
+    def run(self, call):
+        started = time.perf_counter()
+        hold = self.hold() if self.hold is not None else contextlib.nullcontext()
+        try:
+            with hold:
+                if inspect.iscoroutinefunction(call.function):
+                    future = asyncio.run_coroutine_threadsafe(call.function(*call.params), self.loop)
+                    # Only wait for the coroutine if the next call with the same key has to wait for it
+                    if call.key is not None:
+                        future.result()
+                    else:
+                        future.add_done_callback(self.done)
+                elif getattr(call.function, "cpu_bound", False):
+                    with self.lock:
+                        if self.processes is None:
+                            self.processes = concurrent.futures.ProcessPoolExecutor(self.max_processes)
+                        processes = self.processes
+                    processes.submit(call.function, *call.params).result()
+                else:
+                    call.function(*call.params)
+        except Exception:
+            logging.exception(f"Exception in bridge function {call.function}")
+
+        if self.stats is not None and self.stats.enabled:
+            name = getattr(call.function, "__qualname__", str(call.function))
+            self.stats.handler(call.function_id or name, name, call.queued, started)
+
+    def done(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            logging.error("Exception in bridge function", exc_info=future.exception())
+
+    def shutdown(self, wait=True):
+        # The pools are created again by the next call, i.e when a closed window is shown again
+        with self.lock:
+            threads, self.threads = self.threads, None
+            processes, self.processes = self.processes, None
+        if threads is not None:
+            threads.shutdown(wait)
+        if processes is not None:
+            processes.shutdown(wait)
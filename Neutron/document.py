@@ -0,0 +1,85 @@
+from bs4 import BeautifulSoup, Tag
+
+from .elements import ID_ATTRIBUTE
+
+"""
+
+The Document is the parsed HTML of a window before it is shown.
+It is created once by display(), every change made before show() is applied to it in place,
+and it is only serialized back to HTML when the window is shown.
+Elements are indexed by id and tag name so lookups do not have to walk the whole document.
+
+"""
+
+class Document:
+    def __init__(self, soup):
+        self.soup = soup
+        self.by_id = {}
+        self.by_tag = {}
+
+        for element in soup.find_all():
+            self.by_tag.setdefault(element.name, []).append(element)
+            if element.get('id') is not None:
+                self.by_id.setdefault(element['id'], element)
+
+    def __str__(self):
+        return str(self.soup)
+
+    def getElementById(self, id):
+        element = self.by_id.get(id)
+
+        # The element might have been removed from the document since it was indexed
+        if element is not None and not self.contains(element):
+            del self.by_id[id]
+            return None
+        return element
+
+    def getElementsByTagName(self, name):
+        elements = self.by_tag.get(name)
+
+        # Rebuilt after elements with this tag name were added or removed, to keep document order
+        if elements is None:
+            elements = self.by_tag[name] = self.soup.find_all(name)
+        return elements
+
+    def getElementByNeutronId(self, NeutronID):
+        return self.soup.find(attrs={ID_ATTRIBUTE: NeutronID})
+
+    def new_tag(self, name):
+        return self.soup.new_tag(name)
+
+    def parse(self, html):
+        return BeautifulSoup(html, 'html.parser')
+
+    def contains(self, element):
+        for parent in element.parents:
+            if parent is self.soup:
+                return True
+        return False
+
+    def added(self, root):
+        # Index an element, or all elements of a fragment, that was inserted into the document
+        for element in walk(root):
+            self.by_tag.pop(element.name, None)
+            if element.get('id') is not None and self.getElementById(element['id']) is None:
+                self.by_id[element['id']] = element
+
+    def removed(self, root):
+        # Drop an element, or all elements of a fragment, that is about to be removed from the document
+        for element in walk(root):
+            self.by_tag.pop(element.name, None)
+            if element.get('id') is not None and self.by_id.get(element['id']) is element:
+                del self.by_id[element['id']]
+
+    def id_changed(self, element, old, new):
+        if old is not None and self.by_id.get(old) is element:
+            del self.by_id[old]
+        if new is not None and self.contains(element) and self.getElementById(new) is None:
+            self.by_id[new] = element
+
+
+def walk(root):
+    if isinstance(root, Tag) and root.name != '[document]':
+        yield root
+    if hasattr(root, 'find_all'):
+        yield from root.find_all()
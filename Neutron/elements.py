@@ -1,27 +1,55 @@
-from bs4 import BeautifulSoup
-import uuid
+import itertools
+import json
+import threading
 
 """
 
 Neutron passes HTML elements beetween JavaScript and Python using a custom ID system "NeutronID".
-The NeutronID is located in an elements classlist, and is generated when display() is first called.
+The NeutronID is stored in the data-nid attribute of an element, and is generated when display() is first called.
+The page keeps a map from NeutronID to element, elements added later get a NeutronID from the page itself.
 Using this system Neutron can share HTML elements that do not have a regular HTML id,
 for example HTML elements returned by getElementsByTagName().
-Every NeutronID is an UUID.
+A NeutronID is a counter in base 36 (lowercase), NeutronIDs given by the page start with an uppercase "P" so they never collide.
 
 """
 
+ID_ATTRIBUTE = "data-nid"
+ID_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+neutron_ids = itertools.count()
+neutron_ids_lock = threading.Lock()
+
 def createNeutronId(tag):
-    NeutronID = f"NeutronID_{uuid.uuid1()}"
+    number = next(neutron_ids)
 
-    element_classes = tag.get('class')
-    if element_classes is not None:
-        tag['class'] = NeutronID + " " + " ".join(element_classes)
-    else:
-         tag['class'] = NeutronID
+    NeutronID = ""
+    while True:
+        number, digit = divmod(number, 36)
+        NeutronID = ID_DIGITS[digit] + NeutronID
+        if not number:
+            break
 
+    tag[ID_ATTRIBUTE] = NeutronID
     return NeutronID
 
+def getNeutronId(tag):
+    return tag.get(ID_ATTRIBUTE)
+
+def reserveNeutronIds(count):
+    # Make sure NeutronIDs below `count` are not given out again, they are used by a precompiled bundle
+    global neutron_ids
+    with neutron_ids_lock:
+        current = next(neutron_ids)
+        neutron_ids = itertools.count(max(current, count))
+
+
+def append_script(parent, html_element):
+    # Parses the HTML once and inserts the nodes after the existing children, which are left untouched.
+    # Elements already in the page are moved, like the DOM appendChild does
+    if isinstance(html_element, HTMLelement) and html_element.domAttatched and html_element.window.running:
+        return f"{parent}.appendChild({html_element.js_element});"
+    return f"{parent}.insertAdjacentHTML('beforeend', {json.dumps(str(html_element))});"
+
 
 # Web componets #
 
@@ -50,6 +78,9 @@ HTMLelementAttributes = ['value', 'accept', 'action', 'align', 'allow', 'alt', '
                          'onratechange', 'onseeked', 'onseeking', 'onstalled', 'onsuspend', 'ontimeupdate', 'onvolumechange',
                          'onwaiting', 'ontoggle',]
 
+# Looked up on every attribute access of an HTMLelement
+HTMLelementAttributeNames = frozenset(attribute.strip() for attribute in HTMLelementAttributes)
+
 class ClassList():
     def __init__(self, elem, list:list):
         self.elem = elem
@@ -59,97 +90,170 @@ class ClassList():
     def add(self, value):
         if not (value in self.list):
             self.list.append(value)
-            self.save_list()
+            self.save_list(f"add({json.dumps(value)})")
     def remove(self, value):
         if value in self.list:
             self.list.remove(value)
-            self.save_list()
+            self.save_list(f"remove({json.dumps(value)})")
     def replace(self, old, new):
         if old in self.list:
             self.list.remove(old)
             self.list.append(new)
-            self.save_list()
+            self.save_list(f"replace({json.dumps(old)}, {json.dumps(new)})")
             return True
         else: return False
     def toggle(self, value, force:bool=False):
         if value in self.list:
             self.list.remove(value)
-            self.save_list()
+            self.save_list(f"remove({json.dumps(value)})")
             return False
         elif force: return False
         else:
             self.list.append(value)
-            self.save_list()
+            self.save_list(f"add({json.dumps(value)})")
             return True
-    def save_list(self):
-        self.elem.classList = self.list
+    def save_list(self, change=None):
+        # While the window is running only the change is sent, so other changes to the classes are kept
+        if change is not None and self.elem.window.running and self.elem.domAttatched:
+            self.elem.window.run_javascript(f"{self.elem.js_element}.classList.{change};")
+        else:
+            self.elem.classList = self.list
 
 class HTMLelement:
+    # Tens of thousands of handles can be alive at once, they do not get a __dict__
+    __slots__ = ("window", "soup", "NeutronID", "domAttatched")
+
     def __init__(self, window, NeutronID, element_soup, domAttatched):
         self.window = window
-        self.element_soup = element_soup # element_soup is None if element is aquired while window is running
+        self.soup = element_soup # element_soup is None if element is aquired while window is running
         self.NeutronID = NeutronID
         self.domAttatched = domAttatched;
 
-        if "NeutronID_" not in self.NeutronID:
+        if not NeutronID:
             raise ValueError("NeutronID is invalid")
 
+    @property
+    def element_soup(self):
+        # Elements found through the index of a bundle before show() are only looked up in the document once it is used
+        if self.soup is None and self.domAttatched and self.window.websocket_server is None:
+            self.soup = self.window.document.getElementByNeutronId(self.NeutronID)
+        return self.soup
+
+    # HTML attributes (HTMLelementAttributes) are read and written through getAttribute and setAttribute, i.e element.value
+    def __getattr__(self, name):
+        # Only called for names that are not a slot or a method
+        if name in HTMLelementAttributeNames:
+            return self.getAttribute(name)
+        raise AttributeError(f"'HTMLelement' object has no attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        if name in HTMLelementAttributeNames:
+            self.setAttribute(name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    @property
+    def js_element(self):
+        # JavaScript expression for the element, resolved through the NeutronID registry of the page
+        return f'neutronElement("{self.NeutronID}")'
+
+    def mirrored(self, property):
+        # Value of `property` kept in Python by Window.mirror(), None if it has to be read from the page
+        return self.window.mirror_cache.get(self.NeutronID, property)
+
     def __str__(self):
         # element_soup will be set to None if class is called on runtime
         if self.window.running and self.domAttatched:
-            return str(self.window.run_javascript(f""" '' + document.getElementsByClassName("{self.NeutronID}")[0].outerHTML;"""))
+            cached = self.mirrored("outerHTML")
+            if cached is not None:
+                return cached
+            return str(self.window.run_javascript(f"""{self.js_element}.outerHTML;""", defer=False))
         else:
             return str(self.element_soup)
 
 
     def addEventListener(self, eventHandler, NeutronEvent):
+        # NeutronEvent is the JavaScript returned by Neutron.event(), or a python function which is then owned by the element
+        functionId = None
+        if callable(NeutronEvent):
+            functionId = self.window.register_handler(NeutronEvent, self)
+            NeutronEvent = self.window.bridge_call(functionId)
+
         if self.window.running and self.domAttatched:
             self.window.run_javascript(
-                f""" '' + document.getElementsByClassName("{self.NeutronID}")[0].addEventListener("{eventHandler}", {NeutronEvent});""");
+                f"""neutronListen("{self.NeutronID}", {json.dumps(eventHandler)}, {json.dumps(functionId)}, function(event) {{ {NeutronEvent}; }});""")
         else:
             eventHandler = "on" + eventHandler
-            soup = BeautifulSoup(self.window.html, features="html.parser")
             # Create a new attribute for the event (i.e onclick)
-            soup.find_all(class_=self.NeutronID)[0][eventHandler] = NeutronEvent
-
-            self.window.html = str(soup)
+            self.element_soup[eventHandler] = NeutronEvent
 
     def appendChild(self, html_element):
         if self.window.running and self.domAttatched:
-            soup = BeautifulSoup(str(html_element), features="html.parser")
-            bodyContent = soup.find_all()
-
-            for element in bodyContent:
-                createNeutronId(element)
-
-            self.window.run_javascript(f"""document.getElementsByClassName("{self.NeutronID}")[0].innerHTML += '{str(soup)}';""")
+            self.window.run_javascript(append_script(self.js_element, html_element))
+            if isinstance(html_element, HTMLelement):
+                html_element.domAttatched = True
             return html_element
         else:
-            self.element_soup.append(BeautifulSoup(str(html_element), 'html.parser'))
+            if isinstance(html_element, HTMLelement) and html_element.element_soup is not None:
+                # Move the element itself, like the DOM does, so the handle keeps working
+                self.insert([html_element.element_soup])
+                html_element.domAttatched = self.domAttatched
+            else:
+                self.insert(self.parse(str(html_element)))
+            return html_element
 
-    def append(self, html):
+    def removeEventListener(self, eventHandler, function):
+        """
+        Removes the listeners of the python `function` added with `addEventListener(eventHandler, function)`.
+        """
+        functionId = self.window.handlers.id(function)
+        if functionId is None:
+            return
         if self.window.running and self.domAttatched:
-            soup = BeautifulSoup(html, features="html.parser")
-            bodyContent = soup.find_all()
+            self.window.run_javascript(f"""neutronUnlisten([{json.dumps(functionId)}], "{self.NeutronID}", {json.dumps(eventHandler)});""")
+        elif self.element_soup.get("on" + eventHandler) == self.window.bridge_call(functionId):
+            del self.element_soup["on" + eventHandler]
 
-            for element in bodyContent:
-                createNeutronId(element)
-
-            self.window.run_javascript(f"""document.getElementsByClassName("{self.NeutronID}")[0].innerHTML += '{str(soup)}';""")
+    def append(self, html):
+        if self.window.running and self.domAttatched:
+            self.window.run_javascript(append_script(self.js_element, html))
         else:
-            self.element_soup.append(BeautifulSoup(html, 'html.parser'))
+            self.insert(self.parse(html))
+
+    def append_many(self, htmls):
+        """
+        Appends every HTML string of `htmls`, in a single message and a single parse of the page.
+        """
+        self.append("".join(str(html) for html in htmls))
+
+    def parse(self, html):
+        # Parse an HTML fragment and give its elements a NeutronID, returns the top level nodes
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        for element in soup.find_all():
+            createNeutronId(element)
+        return list(soup.contents)
+
+    def insert(self, nodes):
+        for node in nodes:
+            self.element_soup.append(node)
+            if self.domAttatched:
+                self.window.document.added(node)
 
     # TODO
     def remove(self):
         if not self.window.running or not self.domAttatched:
              raise RuntimeError(""""remove" can only be called while the window is running and element is present on DOM!""")
 
-        self.window.run_javascript(f"""document.getElementsByClassName("{self.NeutronID}")[0].remove();""")
+        self.window.run_javascript(f"""{self.js_element}.remove();""")
 
      # Does not work with global event handlers!
     def getAttribute(self, attribute):
         if self.window.running and self.domAttatched:
-            return str(self.window.run_javascript(f""" '' + document.getElementsByClassName("{self.NeutronID}")[0].{attribute};"""))
+            cached = self.mirrored(attribute)
+            if cached is not None:
+                return cached
+            return self.window.run_javascript(f"""{self.js_element}.{attribute};""")
         else:
             return self.element_soup.attrs
 
@@ -157,17 +261,45 @@ class HTMLelement:
     def setAttribute(self, attribute, value):
         if self.window.running and self.domAttatched:
             self.window.run_javascript(
-                f""" '' + document.getElementsByClassName("{self.NeutronID}")[0].setAttribute("{attribute}", "{value}");""")
+                f"""{self.js_element}.setAttribute({json.dumps(attribute)}, {json.dumps(str(value))});""")
         else:
+            old = self.element_soup.get(attribute)
             self.element_soup[attribute] = value
+            if attribute == 'id' and self.domAttatched:
+                self.window.document.id_changed(self.element_soup, old, value)
+
+    async def getAttribute_async(self, attribute):
+        if self.window.running and self.domAttatched:
+            cached = self.mirrored(attribute)
+            if cached is not None:
+                return cached
+            return await self.window.run_javascript_async(f"""{self.js_element}.{attribute};""")
+        else:
+            return self.getAttribute(attribute)
+
+    async def setAttribute_async(self, attribute, value):
+        if self.window.running and self.domAttatched:
+            await self.window.run_javascript_async(
+                f"""{self.js_element}.setAttribute({json.dumps(attribute)}, {json.dumps(str(value))});""")
+        else:
+            self.setAttribute(attribute, value)
 
     def removeAttribute(self, attribute):
         if self.window.running and self.domAttatched:
             self.window.run_javascript(
-                f""" '' + document.getElementsByClassName("{self.NeutronID}")[0].removeAttribute("{attribute}");"""
+                f"""{self.js_element}.removeAttribute({json.dumps(attribute)});"""
             )
         else:
+            old = self.element_soup.get(attribute)
             del self.element_soup[attribute]
+            if attribute == 'id' and self.domAttatched:
+                self.window.document.id_changed(self.element_soup, old, None)
+
+    async def removeAttribute_async(self, attribute):
+        if self.window.running and self.domAttatched:
+            await self.window.run_javascript_async(f"""{self.js_element}.removeAttribute({json.dumps(attribute)});""")
+        else:
+            self.removeAttribute(attribute)
 
     @property
     def classList(self):
@@ -177,40 +309,148 @@ class HTMLelement:
         but then you must call `classList.save_list()` to finalize your mutation.
         """
         if self.window.running and self.domAttatched:
-            classList = str(self.window.run_javascript(f"""document.getElementsByClassName("{self.NeutronID}")[0].classList;""")).split(' ')
-            classList.remove(self.NeutronID) # hide the NeutronID
-            return ClassList(self, classList)
+            classList = self.mirrored("className")
+            if classList is None:
+                return ClassList(self, self.window.run_javascript(f"""Array.from({self.js_element}.classList);""", defer=False))
+            return ClassList(self, classList.split())
         else:
-            classList = self.element_soup['class']
-            classList.remove(self.NeutronID) # hide the NeutronID
-            return ClassList(self, classList)
+            return ClassList(self, list(self.element_soup.get('class') or []))
     @classList.setter
     def classList(self, value:list|ClassList):
         if self.window.running and self.domAttatched:
-            classList = str(self.NeutronID) # sneak in the NeutronID
-            for c in value:
-                classList = f"{classList} {str(c)}"
-            self.window.run_javascript(f"""document.getElementsByClassName("{self.NeutronID}")[0].setAttribute("class", "{classList}");""")
+            classList = " ".join(str(c) for c in value)
+            self.window.run_javascript(f"""{self.js_element}.setAttribute("class", {json.dumps(classList)});""")
         else:
-            classList = [str(self.NeutronID)] # sneak in the NeutronID
-            classList.extend(value)
-            self.element_soup['class'] = classList
+            classList = [str(c) for c in value]
+            if classList:
+                self.element_soup['class'] = classList
+            elif self.element_soup.get('class') is not None:
+                del self.element_soup['class']
 
     def innerHTML_get(self):
         if self.window.running and self.domAttatched:
-            return str(self.window.run_javascript(f""" '' + document.getElementsByClassName("{self.NeutronID}")[0].innerHTML;"""))
+            cached = self.mirrored("innerHTML")
+            if cached is not None:
+                return cached
+            return self.window.run_javascript(f"""{self.js_element}.innerHTML;""")
         else:
             return self.element_soup.decode_contents()
 
     def innerHTML_set(self, value):
         if self.window.running and self.domAttatched:
-            self.window.run_javascript(f"""document.getElementsByClassName("{self.NeutronID}")[0].innerHTML = "{value}";""")
+            self.window.run_javascript(f"""{self.js_element}.innerHTML = {json.dumps(str(value))};""")
         else:
+            if self.domAttatched:
+                for child in self.element_soup.contents:
+                    self.window.document.removed(child)
             self.element_soup.clear()
-            self.element_soup.append(BeautifulSoup(value, 'html.parser'))
+            self.insert(self.parse(value))
 
     innerHTML = property(innerHTML_get, innerHTML_set)
 
-    for attribute in HTMLelementAttributes:
-        exec(
-            f"{attribute} = property(lambda self: self.getAttribute('{attribute}'), lambda self, val: self.setAttribute('{attribute}', val))")
+    async def innerHTML_get_async(self):
+        if self.window.running and self.domAttatched:
+            cached = self.mirrored("innerHTML")
+            if cached is not None:
+                return cached
+            return await self.window.run_javascript_async(f"""{self.js_element}.innerHTML;""")
+        else:
+            return self.innerHTML_get()
+
+    async def innerHTML_set_async(self, value):
+        if self.window.running and self.domAttatched:
+            await self.window.run_javascript_async(f"""{self.js_element}.innerHTML = {json.dumps(str(value))};""")
+        else:
+            self.innerHTML_set(value)
+
+
+class CollectionClassList():
+    def __init__(self, collection):
+        self.collection = collection
+    def add(self, *values):
+        self.collection.forEach(f"element.classList.add(...{json.dumps(values)})", lambda elem: [elem.classList.add(value) for value in values])
+    def remove(self, *values):
+        self.collection.forEach(f"element.classList.remove(...{json.dumps(values)})", lambda elem: [elem.classList.remove(value) for value in values])
+    def toggle(self, value, force:bool=None):
+        """
+        Toggles `value` on every element, returns a `list` with the result for each element.
+        """
+        if self.collection.running:
+            force = "undefined" if force is None else json.dumps(force)
+            return self.collection.map(f"element.classList.toggle({json.dumps(value)}, {force})")
+        else:
+            results = []
+            for elem in self.collection:
+                classList = elem.classList
+                if value in classList.list and force is not True:
+                    classList.remove(value)
+                    results.append(False)
+                elif value not in classList.list and force is not False:
+                    classList.add(value)
+                    results.append(True)
+                else:
+                    results.append(value in classList.list)
+            return results
+
+class HTMLCollection(list):
+    """
+    A `list` of `HTMLelement` returned by `Window.getElementsByTagName()`.\n
+    The bulk methods `get`, `set`, `map` and `classList` act on every element in a single round trip.
+    """
+    def __init__(self, window, elements):
+        super().__init__(elements)
+        self.window = window
+
+    @property
+    def running(self):
+        return self.window.running and all(elem.domAttatched for elem in self)
+
+    @property
+    def js_elements(self):
+        # JavaScript expression for an array with every element of the collection
+        return f"{json.dumps([elem.NeutronID for elem in self])}.map(neutronElement)"
+
+    def map(self, javascript):
+        """
+        Evaluates the JavaScript expression `javascript` for every element, available as `element`.\n
+        Returns a `list` with the typed results.
+        """
+        if not self.running:
+            raise RuntimeError(""""HTMLCollection.map()" can only be called while the window is running!""")
+        return self.window.run_javascript(
+            f"{self.js_elements}.map(function(element) {{ return {javascript}; }});", defer=False)
+
+    def forEach(self, javascript, fallback=None):
+        # Runs the JavaScript statement `javascript` for every element, `fallback` is used before the window is shown
+        if self.running:
+            self.window.run_javascript(f"{self.js_elements}.forEach(function(element) {{ {javascript}; }});")
+        elif fallback is not None:
+            for elem in self:
+                fallback(elem)
+
+    def get(self, attribute):
+        """
+        Returns a `list` with the `attribute` property of every element.
+        """
+        if self.running:
+            return self.map(f"element[{json.dumps(attribute)}]")
+        else:
+            return [elem.element_soup.get(attribute) for elem in self]
+
+    def set(self, attribute, value):
+        """
+        Sets the `attribute` property of every element to `value`, which can be any JSON value.
+        """
+        def fallback(elem):
+            # Boolean attributes such as disabled are only present when true
+            if value is False or value is None:
+                if elem.element_soup.get(attribute) is not None:
+                    elem.removeAttribute(attribute)
+            else:
+                elem.setAttribute(attribute, "" if value is True else value)
+
+        self.forEach(f"element[{json.dumps(attribute)}] = {json.dumps(value)}", fallback)
+
+    @property
+    def classList(self):
+        return CollectionClassList(self)
@@ -0,0 +1,107 @@
+import logging
+import mimetypes
+import os
+
+from PyQt6.QtCore import QBuffer, QFile, QIODevice, QObject, pyqtSignal, pyqtSlot
+from PyQt6.QtWebChannel import QWebChannel
+from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEngineUrlRequestJob, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler
+
+from .assets import AssetCache, read_cached, resolve
+
+"""
+
+The in-process transport of Window(transport="qt"), it does not open any port.
+The page is loaded from the neutron:// scheme, neutron://<window ID>/path is the file at path in the assets directory of
+the window, served by a QWebEngineUrlSchemeHandler. Messages go through a QWebChannel, one object per window with
+a signal for the messages to the page and a slot for the messages from the page.
+QWebChannel only carries text, binary messages (see Neutron/buffers.py) are sent as base64 prefixed with "#".
+Only imported once Qt is used, the scheme has to be registered before the QApplication is created.
+
+"""
+
+SCHEME = b"neutron"
+
+
+def register_scheme():
+    scheme = QWebEngineUrlScheme(SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+
+    flags = QWebEngineUrlScheme.Flag.SecureScheme | QWebEngineUrlScheme.Flag.CorsEnabled
+    # Older versions of Qt do not allow fetch() on custom schemes
+    if hasattr(QWebEngineUrlScheme.Flag, "FetchApiAllowed"):
+        flags |= QWebEngineUrlScheme.Flag.FetchApiAllowed
+    scheme.setFlags(flags)
+
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+class AssetSchemeHandler(QWebEngineUrlSchemeHandler):
+    def __init__(self, roots, cache=None):
+        super().__init__()
+        self.roots = roots # Host (window ID) -> real path of the assets directory, None if there is no such window
+        self.cache = cache or AssetCache()
+
+    def requestStarted(self, job):
+        url = job.requestUrl()
+        root = self.roots(url.host())
+        path = resolve(root, url.path()) if root else None
+        if path is None or not os.path.isfile(path):
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+
+        content_type = (mimetypes.guess_type(path)[0] or "application/octet-stream").encode()
+
+        # Small files come from the cache, large files are read by Qt
+        stat = os.stat(path)
+        if stat.st_size <= self.cache.max_file_bytes:
+            device = QBuffer(job)
+            device.setData(read_cached(self.cache, path, stat)[0])
+        else:
+            device = QFile(path, job)
+        device.open(QIODevice.OpenModeFlag.ReadOnly)
+        job.reply(content_type, device)
+
+
+def install_scheme_handler(roots):
+    handler = AssetSchemeHandler(roots)
+    QWebEngineProfile.defaultProfile().installUrlSchemeHandler(SCHEME, handler)
+    return handler
+
+
+class ChannelObject(QObject):
+    # Registered with the QWebChannel of a page as "neutron"
+    message = pyqtSignal(str)
+
+    def __init__(self, receive):
+        super().__init__()
+        self.receiver = receive
+
+    @pyqtSlot(str)
+    def receive(self, message):
+        try:
+            self.receiver(message)
+        except Exception:
+            logging.exception("Exception while receiving a message from the page")
+
+
+def attach(page, receive):
+    # Returns the object the page talks to, messages from the page are passed to `receive`
+    channel_object = ChannelObject(receive)
+    channel = QWebChannel(page)
+    channel.registerObject("neutron", channel_object)
+    page.setWebChannel(channel)
+    return channel_object
+
+
+webchannel_source = None
+
+def webchannel_script():
+    # qwebchannel.js, inlined so the page does not have to load it from qrc:
+    global webchannel_source
+    if webchannel_source is None:
+        file = QFile(":/qtwebchannel/qwebchannel.js")
+        if not file.open(QIODevice.OpenModeFlag.ReadOnly):
+            raise RuntimeError("qwebchannel.js was not found in the Qt resources!")
+        webchannel_source = bytes(file.readAll()).decode()
+        file.close()
+    return webchannel_source
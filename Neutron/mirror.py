@@ -0,0 +1,78 @@
+import json
+import threading
+
+"""
+
+Mirror mode keeps a copy of some properties of tracked elements in Python, so reading them does not need a round trip.
+The page sends a snapshot of a tracked element whenever it changes: its attributes, its children or text
+(MutationObserver), or its value through user input (input and change events).
+Snapshots are sent before the reply to a message from Python, so once the page has replied to every message
+Python sent, the snapshots reflect everything Python did. Only then reads are served from the copy,
+while a message is in flight or scripts are queued in a batch they go to the page as usual.
+
+"""
+
+# Properties kept by default, the ones read by getAttribute("value"), getAttribute("checked"), classList, innerHTML
+DEFAULT_PROPERTIES = ["value", "checked", "className", "innerHTML"]
+
+
+class Mirror:
+    def __init__(self, window):
+        self.window = window
+        self.lock = threading.Lock()
+        self.properties = {} # NeutronID -> names of the tracked properties
+        self.snapshots = {} # NeutronID -> {property: value}
+        self.hits = 0
+        self.misses = 0
+
+    def track(self, NeutronIDs, properties=None):
+        properties = list(properties or DEFAULT_PROPERTIES)
+        with self.lock:
+            for NeutronID in NeutronIDs:
+                self.properties[NeutronID] = properties
+
+        snapshots = self.window.run_javascript(
+            f"neutronMirrorTrack({json.dumps(NeutronIDs)}, {json.dumps(properties)});", defer=False)
+        self.update(snapshots)
+
+    def untrack(self, NeutronIDs):
+        with self.lock:
+            for NeutronID in NeutronIDs:
+                self.properties.pop(NeutronID, None)
+                self.snapshots.pop(NeutronID, None)
+
+        if self.window.running:
+            self.window.run_javascript(f"neutronMirrorUntrack({json.dumps(NeutronIDs)});")
+
+    def update(self, snapshots):
+        # Snapshots sent by the page, None for elements that were removed from the page
+        with self.lock:
+            for NeutronID, snapshot in snapshots.items():
+                if snapshot is None or NeutronID not in self.properties:
+                    self.snapshots.pop(NeutronID, None)
+                else:
+                    self.snapshots[NeutronID] = snapshot
+
+    def get(self, NeutronID, property):
+        """
+        Returns the mirrored value of `property`, typed like a read from the page, or `None` if it has to be read from the page.
+        """
+        if NeutronID not in self.properties:
+            return None
+
+        server = self.window.websocket_server
+        # Scripts queued in a batch of this thread have not been sent yet, the read flushes them
+        batch = self.window.current_batch()
+        queued = batch is not None and bool(batch.root().scripts)
+        with self.lock:
+            snapshot = self.snapshots.get(NeutronID)
+            # A message in flight might change the element
+            if snapshot is None or property not in snapshot or queued or not server.settled():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return snapshot[property]
+
+    def summary(self):
+        with self.lock:
+            return {"tracked": len(self.properties), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,393 @@
+import bisect
+import contextlib
+import html
+import json
+import logging
+import threading
+
+"""
+
+Reactive state for a window.
+A State is an object with observable attributes, a binding renders a property of an element, or the rows of a list,
+from a State. Changing a State marks its bindings as changed, on the next tick of the window they are rendered again
+and only what changed is sent to the page: property values that differ from the last ones, and for keyed lists
+the rows that were inserted, moved, removed or rendered differently. Everything that changed in a tick is sent as one message.
+Changes made by a bridge function are sent once it returns, so the page never shows half of an update.
+Before the window is shown bindings are rendered into the document when it is shown.
+
+"""
+
+class Observable:
+    def __init__(self):
+        object.__setattr__(self, "_watchers", [])
+
+    def _watch(self, callback):
+        self._watchers.append(callback)
+
+    def _unwatch(self, callback):
+        if callback in self._watchers:
+            self._watchers.remove(callback)
+
+    def _changed(self):
+        for callback in list(self._watchers):
+            callback()
+
+
+def adopt(parent, values):
+    # Changes of observable values (i.e a State in a list) are changes of the parent
+    for value in values:
+        if isinstance(value, Observable):
+            value._watch(parent._changed)
+
+def release(parent, values):
+    for value in values:
+        if isinstance(value, Observable):
+            value._unwatch(parent._changed)
+
+
+class State(Observable):
+    """
+    Observable state, every attribute assignment notifies the bindings of the state.\n
+    Lists assigned to a State are converted to an `ObservableList` so changing them in place notifies as well.
+    """
+    def __init__(self, **values):
+        super().__init__()
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+            return
+
+        if type(value) is list:
+            value = ObservableList(value)
+
+        old = self.__dict__.get(name)
+        if old is not value:
+            release(self, [old])
+            adopt(self, [value])
+
+        object.__setattr__(self, name, value)
+        self._changed()
+
+    def __delattr__(self, name):
+        release(self, [self.__dict__.get(name)])
+        object.__delattr__(self, name)
+        self._changed()
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={value!r}" for name, value in self.__dict__.items() if not name.startswith("_"))
+        return f"State({values})"
+
+
+class ObservableList(list, Observable):
+    def __init__(self, values=()):
+        list.__init__(self, values)
+        Observable.__init__(self)
+        adopt(self, self)
+
+    def append(self, value):
+        list.append(self, value)
+        adopt(self, [value])
+        self._changed()
+
+    def extend(self, values):
+        values = list(values)
+        list.extend(self, values)
+        adopt(self, values)
+        self._changed()
+
+    def insert(self, index, value):
+        list.insert(self, index, value)
+        adopt(self, [value])
+        self._changed()
+
+    def pop(self, index=-1):
+        value = list.pop(self, index)
+        release(self, [value])
+        self._changed()
+        return value
+
+    def remove(self, value):
+        index = self.index(value)
+        release(self, [self[index]])
+        list.__delitem__(self, index)
+        self._changed()
+
+    def clear(self):
+        release(self, self)
+        list.clear(self)
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        list.reverse(self)
+        self._changed()
+
+    def __setitem__(self, index, value):
+        old = self[index]
+        if isinstance(index, slice):
+            value = list(value)
+            release(self, old)
+            adopt(self, value)
+        else:
+            release(self, [old])
+            adopt(self, [value])
+        list.__setitem__(self, index, value)
+        self._changed()
+
+    def __delitem__(self, index):
+        old = self[index]
+        release(self, old if isinstance(index, slice) else [old])
+        list.__delitem__(self, index)
+        self._changed()
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __imul__(self, count):
+        release(self, self)
+        list.__imul__(self, count)
+        adopt(self, self)
+        self._changed()
+        return self
+
+
+class Binding:
+    """
+    Renders the `property` of an element from a State.\n
+    `value` is the name of an attribute of the state, or a function that is called with the state.
+    """
+    def __init__(self, window, element, state, value, property):
+        self.window = window
+        self.element = element
+        self.state = state
+        self.value = value
+        self.property = property
+        self.last = None
+        self.rendered = False
+
+    def changed(self):
+        self.window.reactive.changed(self)
+
+    def unbind(self):
+        self.state._unwatch(self.changed)
+        self.window.reactive.discard(self)
+
+    def render(self):
+        if callable(self.value):
+            return self.value(self.state)
+        return getattr(self.state, self.value)
+
+    def patch(self):
+        value = self.render()
+        if self.rendered and value == self.last and type(value) is type(self.last):
+            return []
+        self.last = value
+        self.rendered = True
+        return [["set", self.element.NeutronID, self.property, value]]
+
+    def apply(self):
+        # Render into the document, before the window is shown
+        value = self.last = self.render()
+        self.rendered = True
+
+        if self.property in ("textContent", "innerText"):
+            self.element.innerHTML = html.escape(str(value))
+        elif self.property == "innerHTML":
+            self.element.innerHTML = str(value)
+        else:
+            attribute = "for" if self.property == "htmlFor" else self.property
+            # Boolean properties such as disabled are only present when true
+            if value is False or value is None:
+                if self.element.element_soup.get(attribute) is not None:
+                    self.element.removeAttribute(attribute)
+            else:
+                self.element.setAttribute(attribute, "" if value is True else value)
+
+
+class ListBinding(Binding):
+    """
+    Renders the rows of a list into an element, one row per item.\n
+    `key` returns the key of an item, which identifies its row, and `template` returns the HTML of its row (a single element).
+    """
+    def __init__(self, window, element, state, items, key, template):
+        self.window = window
+        self.element = element
+        self.state = state
+        self.items = items
+        self.key = key
+        self.template = template
+
+        # Rows in the page, in order, and their HTML
+        self.keys = []
+        self.rows = {}
+
+    def render(self):
+        items = self.items(self.state) if callable(self.items) else getattr(self.state, self.items)
+
+        keys = []
+        rows = {}
+        for item in items:
+            key = str(self.key(item))
+            if key in rows:
+                raise ValueError(f'Duplicate key "{key}" in list binding')
+            keys.append(key)
+            rows[key] = str(self.template(item))
+        return keys, rows
+
+    def patch(self):
+        keys, rows = self.render()
+        NeutronID = self.element.NeutronID
+        ops = []
+
+        for key in self.keys:
+            if key not in rows:
+                ops.append(["remove", NeutronID, key])
+
+        # Rows are placed from the last one up, each before the row that follows it
+        positions = {key: index for index, key in enumerate(self.keys)}
+        stay = stable(keys, positions)
+        before = None
+        for key in reversed(keys):
+            if key not in positions:
+                ops.append(["insert", NeutronID, key, rows[key], before])
+            else:
+                if key not in stay:
+                    ops.append(["move", NeutronID, key, before])
+                if rows[key] != self.rows[key]:
+                    ops.append(["replace", NeutronID, key, rows[key]])
+            before = key
+
+        self.keys, self.rows = keys, rows
+        return ops
+
+    def apply(self):
+        # Render into the document, before the window is shown
+        keys, rows = self.render()
+
+        soup = self.element.element_soup
+        for row in soup.find_all(attrs={"data-neutron-key": True}, recursive=False):
+            if self.element.domAttatched:
+                self.window.document.removed(row)
+            row.extract()
+
+        for key in keys:
+            nodes = [node for node in self.element.parse(rows[key]) if getattr(node, "name", None)]
+            if not nodes:
+                raise ValueError(f'The template of row "{key}" did not return an element')
+            nodes[0]['data-neutron-key'] = key
+            self.element.insert(nodes[:1])
+
+        self.keys, self.rows = keys, rows
+
+
+def stable(keys, positions):
+    # Keys of the longest run of rows that kept their relative order, every other row has to move
+    indexes = [positions[key] for key in keys if key in positions]
+    present = [key for key in keys if key in positions]
+
+    tails = [] # tails[n] is the smallest last position of an increasing run of length n + 1
+    tail_index = []
+    previous = [None] * len(indexes)
+    for i, position in enumerate(indexes):
+        n = bisect.bisect_left(tails, position)
+        if n == len(tails):
+            tails.append(position)
+            tail_index.append(i)
+        else:
+            tails[n] = position
+            tail_index[n] = i
+        previous[i] = tail_index[n - 1] if n else None
+
+    stay = set()
+    i = tail_index[-1] if tail_index else None
+    while i is not None:
+        stay.add(present[i])
+        i = previous[i]
+    return stay
+
+
+class Updates:
+    """
+    Collects the bindings that changed and sends their patches on the next tick of the event loop, as one message.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.lock = threading.Lock()
+        self.dirty = {} # Bindings to render, in the order they changed
+        self.scheduled = False
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def hold(self):
+        # Changes made by this thread inside the block are only sent once it exits
+        depth = getattr(self.local, "depth", 0)
+        if depth == 0:
+            self.local.pending = {}
+        self.local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self.local.depth = depth
+            if depth == 0:
+                pending, self.local.pending = self.local.pending, None
+                self.mark(pending)
+
+    def changed(self, binding):
+        if getattr(self.local, "depth", 0):
+            self.local.pending[binding] = None
+        else:
+            self.mark([binding])
+
+    def mark(self, bindings):
+        with self.lock:
+            self.dirty.update(dict.fromkeys(bindings))
+        self.schedule()
+
+    def schedule(self):
+        # Before the window is shown the bindings are rendered by show()
+        if not self.window.running:
+            return
+
+        with self.lock:
+            if self.scheduled or not self.dirty:
+                return
+            self.scheduled = True
+
+        self.window.loop.call_soon_threadsafe(self.flush)
+
+    def discard(self, binding):
+        with self.lock:
+            self.dirty.pop(binding, None)
+
+    def flush(self):
+        with self.lock:
+            bindings = list(self.dirty)
+            self.dirty.clear()
+            self.scheduled = False
+
+        if not self.window.running:
+            for binding in bindings:
+                binding.apply()
+            return
+
+        ops = []
+        for binding in bindings:
+            try:
+                ops.extend(binding.patch())
+            except Exception:
+                logging.exception(f"Exception while rendering {binding}")
+
+        if ops:
+            script = "neutronPatch(" + json.dumps(ops, default=str) + ");"
+            self.window.websocket_server.submit(script, "patch").add_done_callback(self.sent)
+
+    def sent(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            logging.error("Reactive update failed", exc_info=future.exception())
@@ -0,0 +1,158 @@
+import inspect
+import itertools
+import threading
+import weakref
+
+"""
+
+The Registry holds the python functions the page can call, every function gets a short ID used by bridge() in the page.
+A function registered more than once keeps its ID. Functions can be registered weakly, their entry goes away when
+the function is garbage collected, and they can be owned by elements, their entry goes away when every element that
+owns it has been removed from the page. Functions registered without an owner stay until they are unregistered.
+
+"""
+
+class Registry:
+    def __init__(self, prefix="h", on_release=None):
+        self.prefix = prefix
+        self.on_release = on_release # Called with the IDs of weak functions that were garbage collected, from inside the collector
+        self.lock = threading.RLock() # Weak references can be collected while it is held
+        self.ids = itertools.count()
+
+        self.functions = {} # ID -> function, or weak reference to it
+        self.strong = {} # Function -> ID
+        self.weak = weakref.WeakKeyDictionary() # Function -> ID
+        self.weak_methods = weakref.WeakKeyDictionary() # Object -> {function of the bound method: ID}
+        self.pinned = set() # IDs registered without an owner
+        self.owners = {} # ID -> NeutronIDs of the elements that own it
+        self.owned = {} # NeutronID -> IDs it owns
+
+    def __len__(self):
+        return len(self.functions)
+
+    def register(self, function, owner=None, weak=False):
+        """
+        Returns the ID of `function`, registering it if needed.\n
+        `owner` is the NeutronID of an element, `weak` only keeps a weak reference to the function.
+        """
+        with self.lock:
+            function_id = self.find(function)
+
+            if function_id is None:
+                function_id = f"{self.prefix}{next(self.ids)}"
+                if weak:
+                    self.functions[function_id] = self.reference(function, function_id)
+                    # A bound method only lives as long as this call, it is keyed by its object instead
+                    if inspect.ismethod(function):
+                        try:
+                            self.weak_methods.setdefault(function.__self__, {})[function.__func__] = function_id
+                        except TypeError:
+                            pass # Unhashable objects (i.e dataclasses) can not be keys, their methods get a new ID every time
+                    else:
+                        self.weak[function] = function_id
+                else:
+                    self.functions[function_id] = function
+                    self.strong[function] = function_id
+
+            if owner is None:
+                self.pinned.add(function_id)
+            else:
+                self.owners.setdefault(function_id, set()).add(owner)
+                self.owned.setdefault(owner, set()).add(function_id)
+
+        return function_id
+
+    def reference(self, function, function_id):
+        def collected(_):
+            with self.lock:
+                self.drop(function_id)
+            if self.on_release:
+                self.on_release([function_id])
+
+        # Bound methods are created on every attribute access, keep a reference to the object instead
+        if inspect.ismethod(function):
+            return weakref.WeakMethod(function, collected)
+        return weakref.ref(function, collected)
+
+    def get(self, function_id):
+        function = self.functions.get(function_id)
+        if isinstance(function, weakref.ref):
+            function = function()
+        return function
+
+    def find(self, function):
+        function_id = self.strong.get(function)
+        if function_id is None:
+            try:
+                if inspect.ismethod(function):
+                    function_id = self.weak_methods.get(function.__self__, {}).get(function.__func__)
+                else:
+                    function_id = self.weak.get(function)
+            except TypeError:
+                pass # Can not be weakly referenced, so it is not a weak key
+        return function_id
+
+    def id(self, function):
+        with self.lock:
+            return self.find(function)
+
+    def unregister(self, function):
+        """
+        Remove `function` (or its ID), returns its ID or `None` if it was not registered.
+        """
+        with self.lock:
+            function_id = function if isinstance(function, str) else self.find(function)
+            if function_id is None or function_id not in self.functions:
+                return None
+            self.drop(function_id)
+        return function_id
+
+    def release(self, NeutronIDs):
+        # The elements were removed from the page, drop the functions only they owned
+        dropped = []
+        with self.lock:
+            for NeutronID in NeutronIDs:
+                for function_id in self.owned.pop(NeutronID, ()):
+                    owners = self.owners.get(function_id)
+                    if owners is not None:
+                        owners.discard(NeutronID)
+                        if not owners and function_id not in self.pinned:
+                            self.drop(function_id)
+                            dropped.append(function_id)
+        return dropped
+
+    def drop(self, function_id):
+        # Called with the lock held
+        function = self.functions.pop(function_id, None)
+        if isinstance(function, weakref.ref):
+            function = function()
+        if function is not None:
+            if self.strong.get(function) == function_id:
+                del self.strong[function]
+            if self.find(function) == function_id:
+                if inspect.ismethod(function):
+                    methods = self.weak_methods[function.__self__]
+                    del methods[function.__func__]
+                    if not methods:
+                        del self.weak_methods[function.__self__]
+                else:
+                    del self.weak[function]
+        self.pinned.discard(function_id)
+        for owner in self.owners.pop(function_id, ()):
+            owned = self.owned.get(owner)
+            if owned is not None:
+                owned.discard(function_id)
+                if not owned:
+                    del self.owned[owner]
+
+    def owner_ids(self):
+        with self.lock:
+            return list(self.owned)
+
+    def summary(self):
+        with self.lock:
+            return {
+                "functions": len(self.functions),
+                "weak": sum(isinstance(function, weakref.ref) for function in self.functions.values()),
+                "owners": len(self.owned),
+            }
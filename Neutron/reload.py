@@ -0,0 +1,65 @@
+import logging
+import os
+import threading
+
+"""
+
+Live reload of a window, Window(live_reload=True).
+The HTML file passed to display() and the css file of the window are polled on a thread of their own (no dependency,
+it works the same on every platform and on network drives), a change is noticed within POLL_INTERVAL seconds.
+A CSS change replaces the style of the window in place, see Window.set_css(). An HTML change is applied to the page
+as a DOM diff, see Window.update_html(): elements that still match keep their NeutronID, so HTMLelements stay valid.
+
+"""
+
+POLL_INTERVAL = 0.5
+
+
+def signature(path):
+    # Changes whenever the file does, None while it does not exist or is empty (i.e an editor replacing or truncating it)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not stat.st_size:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class FileWatcher:
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.files = {} # Path -> [callback, signature]
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def watch(self, path, callback):
+        # `callback(path)` is called on the thread of the watcher every time the file changes
+        with self.lock:
+            self.files[path] = [callback, signature(path)]
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def clear(self):
+        with self.lock:
+            self.files.clear()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                files = list(self.files.items())
+
+            for path, entry in files:
+                current = signature(path)
+                if current is None or current == entry[1]:
+                    continue
+                entry[1] = current
+                try:
+                    entry[0](path)
+                except Exception:
+                    logging.exception(f'Exception while reloading "{path}"')
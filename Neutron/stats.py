@@ -0,0 +1,147 @@
+import collections
+import json
+import os
+import threading
+import time
+
+"""
+
+Instrumentation of the bridge between Python and the page.
+Round trips of run_javascript, bridge events, handler execution times, queue waits and payload sizes are recorded
+in histograms with power of two buckets, so recording is cheap enough to leave enabled.
+Every recording can also be kept as an event in the Chrome trace event format (chrome://tracing, Perfetto).
+When disabled the only cost is checking Stats.enabled.
+
+"""
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = collections.Counter() # Bucket n counts values below 2**n microseconds
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+        self.buckets[int(seconds * 1_000_000).bit_length()] += 1
+
+    def percentile(self, percent):
+        # Upper bound of the bucket the percentile falls in, capped by the largest value seen
+        target = self.count * percent / 100
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(2 ** bucket / 1_000_000, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000,
+            "min_ms": self.min * 1000,
+            "max_ms": self.max * 1000,
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+        }
+
+
+class Stats:
+    def __init__(self, enabled=False, trace_file=None, max_trace_events=100000):
+        self.enabled = enabled or trace_file is not None
+        self.trace_file = trace_file
+
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.trace_events = collections.deque(maxlen=max_trace_events) if trace_file else None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.round_trips = collections.defaultdict(Histogram) # Operation -> round trip latency
+            self.handlers = collections.defaultdict(Histogram) # Function ID -> execution time
+            self.queue_wait = Histogram()
+            self.bridge_events = collections.Counter() # Function ID -> calls from the page
+            self.names = {} # Function ID -> name of the function, only used to display it
+            self.payload_bytes = collections.Counter()
+            self.messages = collections.Counter()
+
+    def record(self, histogram, name, started, category, args=None, label=None):
+        # Record the time since `started` (time.perf_counter()) in histogram[name], traced as `label` if given
+        duration = time.perf_counter() - started
+        with self.lock:
+            histogram[name].add(duration)
+            if self.trace_events is not None:
+                self.trace(label or name, category, started, duration, args)
+
+    def round_trip(self, operation, started, sent, received):
+        self.record(self.round_trips, operation, started, "round_trip", {"sent": sent, "received": received})
+        with self.lock:
+            self.payload_bytes["sent"] += sent
+            self.payload_bytes["received"] += received
+            self.messages["sent"] += 1
+            self.messages["received"] += 1
+
+    def bridge_event(self, function_id, name, size):
+        with self.lock:
+            self.names[function_id] = name
+            self.bridge_events[function_id] += 1
+            self.payload_bytes["bridge"] += size
+            self.messages["bridge"] += 1
+
+    def handler(self, function_id, name, queued, started):
+        # Functions are kept apart by their ID, i.e two lambdas or functions with the same name in different modules
+        self.record(self.handlers, function_id, started, "handler", {"id": function_id}, name)
+        with self.lock:
+            self.names[function_id] = name
+            self.queue_wait.add(started - queued)
+            if self.trace_events is not None:
+                self.trace(name, "queue_wait", queued, started - queued, {"id": function_id})
+
+    def trace(self, name, category, started, duration, args=None):
+        # Complete event ("X"), timestamps in microseconds since the stats were created
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (started - self.start) * 1_000_000,
+            "dur": duration * 1_000_000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        self.trace_events.append(event)
+
+    def summary(self):
+        with self.lock:
+            return {
+                "round_trips": {name: histogram.summary() for name, histogram in self.round_trips.items()},
+                "handlers": {function_id: {"name": self.names.get(function_id, function_id), **histogram.summary()}
+                             for function_id, histogram in self.handlers.items()},
+                "queue_wait": self.queue_wait.summary(),
+                "bridge_events": {function_id: {"name": self.names.get(function_id, function_id), "count": count}
+                                  for function_id, count in self.bridge_events.items()},
+                "payload_bytes": dict(self.payload_bytes),
+                "messages": dict(self.messages),
+            }
+
+    def write_trace(self, path=None):
+        path = path or self.trace_file
+        if path is None or self.trace_events is None:
+            raise RuntimeError("Tracing is not enabled, pass trace_file to Window()")
+
+        with self.lock:
+            events = list(self.trace_events)
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
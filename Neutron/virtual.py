@@ -0,0 +1,81 @@
+import json
+
+"""
+
+Virtual lists render only the rows that are in view, plus `overscan` rows above and below, so a list of a million rows
+keeps a constant number of elements in the page.
+Rows are fetched from Python in pages of `page_size` rows as the list scrolls. The page keeps the last `cache_pages` pages
+it received (least recently used pages are evicted first) and prefetches `prefetch` pages ahead of the scroll direction.
+Every row must be a single element of `row_height` pixels.
+
+"""
+
+class VirtualList:
+    def __init__(self, window, element, row_count, render_row, row_height=24, overscan=10, page_size=100, cache_pages=20, prefetch=1):
+        if cache_pages < 2 + prefetch:
+            raise ValueError("cache_pages must be large enough for the pages in view and the prefetched pages")
+
+        self.window = window
+        self.element = element
+        self.row_count = row_count
+        self.render_row = render_row
+        self.row_height = row_height
+        self.overscan = overscan
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.prefetch = prefetch
+
+        # Pages fetched for an older version of the data are ignored by the page
+        self.version = 0
+        self.started = False
+
+        # ID of fetch() in the registry of the window, called by the page with bridge()
+        self.function_id = None
+
+    def options(self):
+        return {
+            "id": self.element.NeutronID,
+            "function": self.function_id,
+            "count": self.row_count,
+            "version": self.version,
+            "row_height": self.row_height,
+            "overscan": self.overscan,
+            "page_size": self.page_size,
+            "cache_pages": self.cache_pages,
+            "prefetch": self.prefetch,
+            "placeholder": f'<div style="height: {self.row_height}px"></div>',
+        }
+
+    def start(self):
+        # The list is dropped by the page and its fetch function by Python once the element is removed from the page
+        self.window.run_javascript(f"neutronOwn([{json.dumps(self.element.NeutronID)}]); neutronVirtualList({json.dumps(self.options())});")
+        self.started = True
+
+    def rows(self, start, stop):
+        return [str(self.render_row(index)) for index in range(start, min(stop, self.row_count))]
+
+    def fetch(self, NeutronID, page, version):
+        # Bridge function, sends the rows of `page` to the page without waiting for it
+        if version != self.version:
+            return
+
+        start = page * self.page_size
+        rows = self.rows(start, start + self.page_size)
+        self.window.websocket_server.submit(
+            f"neutronVirtualPage({json.dumps(NeutronID)}, {page}, {version}, {json.dumps(rows)});", "virtual_list")
+
+    def refresh(self, row_count=None):
+        """
+        Drop the cached pages and render the rows in view again, i.e after the data changed.\n
+        Pass `row_count` if the number of rows changed.
+        """
+        if row_count is not None:
+            self.row_count = row_count
+        self.version += 1
+
+        if self.started:
+            self.window.run_javascript(
+                f"neutronVirtualReset({json.dumps(self.element.NeutronID)}, {self.row_count}, {self.version});")
+
+    def scroll_to(self, index):
+        self.window.run_javascript(f"{self.element.js_element}.scrollTop = {int(index) * self.row_height};")
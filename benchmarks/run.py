@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+"""
+
+Headless benchmarks for Neutron.
+
+Measures display() parse/NeutronID time and the memory of handles and NeutronIDs for synthetic documents, and with a running window (Qt offscreen platform)
+the run_javascript round trip, bridge event throughput and latency, HTMLelement attribute operations and getElementsByTagName.
+Every document size that needs a running window is measured in its own process, because Window.show() exits the process.
+
+    python benchmarks/run.py --sizes 1000 10000 100000 --output results.json
+    python benchmarks/run.py --compare old.json new.json
+
+"""
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Run without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("QTWEBENGINE_CHROMIUM_FLAGS", "--no-sandbox --disable-gpu")
+
+import Neutron
+
+
+def synthetic_document(elements):
+    # Rows of a div, an input and a span, so a document of n elements has n / 3 rows
+    rows = "".join(
+        f'<div class="row" id="row{i}"><input id="input{i}" value="{i}"><span>Item {i}</span></div>'
+        for i in range(max(elements // 3, 1))
+    )
+    return f"<html><head><title>Benchmark</title></head><body>{rows}</body></html>"
+
+
+def summarize(samples):
+    # Latencies in milliseconds
+    samples = sorted(samples)
+    percentiles = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": percentiles[49],
+        "p99_ms": percentiles[98],
+        "max_ms": samples[-1],
+    }
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def bench_display(size, repeat):
+    html = synthetic_document(size)
+
+    def display():
+        Neutron.Window("Benchmark").display(html=html)
+
+    win = Neutron.Window("Benchmark")
+    win.display(html=html)
+
+    return {
+        "display": timed(display, repeat),
+        "getElementById_preshow": timed(lambda: win.getElementById(f"row{size // 6}"), repeat * 10),
+        "getElementsByTagName_preshow": timed(lambda: win.getElementsByTagName("input"), repeat),
+    }
+
+
+def bench_memory(size):
+    win = Neutron.Window("Benchmark")
+    win.display(html=synthetic_document(size))
+
+    # Memory of the HTMLelement handles of every input
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    inputs = win.getElementsByTagName("input")
+    handle_bytes = (tracemalloc.get_traced_memory()[0] - before) / max(len(inputs), 1)
+    tracemalloc.stop()
+
+    # Size of the NeutronIDs in the document sent to the page
+    html = str(win.document)
+    without_ids = re.sub(r' data-nid="[^"]*"', "", html)
+    elements = html.count(" data-nid=")
+
+    return {
+        "bytes_per_handle": handle_bytes,
+        "document_bytes": len(html),
+        "id_bytes_per_element": (len(html) - len(without_ids)) / max(elements, 1),
+    }
+
+
+# State of the bridge event benchmark, benchmark_event is passed to display() as a python function
+latencies = []
+received = threading.Event()
+expected = [0]
+
+def benchmark_event(sent):
+    latencies.append(time.time() * 1000 - sent)
+    if len(latencies) == expected[0]:
+        received.set()
+
+
+def bench_runtime(win, size, iterations):
+    results = {}
+    rows = max(size // 3, 1)
+
+    results["run_javascript"] = timed(lambda: win.run_javascript("1"), iterations)
+
+    # Many calls in flight from several threads
+    threads = 8
+    def worker():
+        for _ in range(iterations // threads):
+            win.run_javascript("1")
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    results["run_javascript_concurrent_per_second"] = (iterations // threads * threads) / (time.perf_counter() - start)
+
+    # Bridge events fired from the page, latency measured with the wall clock of both sides
+    events = iterations * 5
+    latencies.clear()
+    received.clear()
+    expected[0] = events
+
+    start = time.perf_counter()
+    win.run_javascript(f"for (let i = 0; i < {events}; i++) {{ benchmark_event(performance.timeOrigin + performance.now()); }}")
+    received.wait(60)
+    elapsed = time.perf_counter() - start
+    results["bridge_events_per_second"] = len(latencies) / elapsed
+    results["bridge_event_latency"] = summarize(latencies)
+
+    element = win.getElementById(f"input{rows // 2}")
+    results["getElementById"] = timed(lambda: win.getElementById(f"input{rows // 2}"), iterations)
+    results["attribute_get"] = timed(lambda: element.value, iterations)
+    results["attribute_set"] = timed(lambda: element.setAttribute("title", "benchmark"), iterations)
+    results["append"] = timed(lambda: win.getElementById(f"row{rows // 2}").append("<b>x</b>"), iterations // 10)
+
+    def batched():
+        with win.batch():
+            for _ in range(100):
+                element.setAttribute("title", "benchmark")
+    results["attribute_set_batch_of_100"] = timed(batched, max(iterations // 100, 1))
+
+    results["getElementsByTagName"] = timed(lambda: win.getElementsByTagName("input"), 10)
+    inputs = win.getElementsByTagName("input")
+    results["collection_get"] = timed(lambda: inputs.get("value"), 10)
+
+    return results
+
+
+def run_window(size, iterations, output):
+    # Child process: show a window, measure once the page is connected, then quit
+    win = Neutron.Window("Benchmark", size=(800, 600))
+    win.display(html=synthetic_document(size), pyfunctions=[benchmark_event])
+
+    def measure():
+        try:
+            results = bench_runtime(win, size, iterations)
+            results["stats"] = win.stats()
+            with open(output, "w", encoding="utf-8") as file:
+                json.dump(results, file)
+        finally:
+            from PyQt6.QtWidgets import QApplication
+            QApplication.instance().quit()
+
+    win.show(after=measure)
+
+
+def environment():
+    try:
+        from importlib.metadata import version
+        neutron_version = version("neutron-web")
+    except Exception:
+        neutron_version = "unknown"
+
+    return {
+        "neutron": neutron_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(old_path, new_path):
+    # Print the ratio new / old of every mean and p99 latency, and every rate
+    with open(old_path, encoding="utf-8") as file:
+        old = json.load(file)["results"]
+    with open(new_path, encoding="utf-8") as file:
+        new = json.load(file)["results"]
+
+    def walk(old, new, path):
+        for key, value in new.items():
+            if key not in old or key == "stats":
+                continue
+            if isinstance(value, dict):
+                walk(old[key], value, path + [key])
+            elif key in ("mean_ms", "p99_ms") or key.endswith("per_second") or key.endswith("bytes") or "_bytes_per_" in key or key.startswith("bytes_per_"):
+                ratio = value / old[key] if old[key] else float("inf")
+                print(f"{'.'.join(path + [key]):70} {old[key]:12.3f} {value:12.3f} {ratio:8.2f}x")
+
+    walk(old, new, [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neutron benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="number of elements of the synthetic documents")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of the display() benchmarks")
+    parser.add_argument("--iterations", type=int, default=1000, help="iterations of the runtime benchmarks")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--skip-window", action="store_true", help="only run the benchmarks that do not need a window")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--window", type=int, help=argparse.SUPPRESS) # Used by the child processes
+    arguments = parser.parse_args()
+
+    if arguments.compare:
+        compare(*arguments.compare)
+        return
+
+    if arguments.window is not None:
+        run_window(arguments.window, arguments.iterations, arguments.output)
+        return
+
+    results = {}
+    for size in arguments.sizes:
+        print(f"{size} elements: display()", flush=True)
+        results[str(size)] = bench_display(size, arguments.repeat)
+        results[str(size)]["memory"] = bench_memory(size)
+
+        if arguments.skip_window:
+            continue
+
+        print(f"{size} elements: running window", flush=True)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "window.json")
+            process = subprocess.run([sys.executable, os.path.abspath(__file__), "--window", str(size),
+                                      "--iterations", str(arguments.iterations), "--output", output])
+            if process.returncode == 0 and os.path.exists(output):
+                with open(output, encoding="utf-8") as file:
+                    results[str(size)].update(json.load(file))
+            else:
+                results[str(size)]["error"] = f"window benchmark exited with code {process.returncode}"
+
+    with open(arguments.output, "w", encoding="utf-8") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=2)
+    print(f"Results written to {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
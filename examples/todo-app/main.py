@@ -1,28 +1,32 @@
+import html
 import Neutron
 
 # All the CSS and HTML in this example is based on https://bbbootstrap.com/snippets/todo-list-jquery-and-font-awesome-icons-77769811
 
 win = Neutron.Window("Example", size=(800, 500), css="def.css")
 
-tasks = [0, 1, 2]
+state = Neutron.State(tasks=[
+    {"id": 0, "name": "Learn HTML"},
+    {"id": 1, "name": "Learn Python"},
+    {"id": 2, "name": "Make a Neutron project"},
+], next_id=3)
+
+def TaskHtml(task):
+    return f'<li><span onclick="RemoveTask({task["id"]})"><i class="fa fa-trash">X</i></span> {html.escape(task["name"])}</li>'
 
 def CreateTask(key):
     if key == "Enter":
-        taskId = len(tasks)
-        tasks.append(taskId)
-
         taskName = win.getElementById("addTask").value
 
-        # Create task element
+        # Only the new row is sent to the page
+        state.tasks.append({"id": state.next_id, "name": taskName})
+        state.next_id += 1
 
-        taskHtml = f'<li id="task{taskId}"><span onclick="RemoveTask(this.parentNode.id)"><i class="fa fa-trash">X</i></span> {taskName}</li>'
-        win.getElementById("tasks").append(taskHtml)
-
-        # Or you can do it like this...
+        # Or you can create the elements yourself...
 
         """
         task = win.createElement("li")
-        task.id = f"task{taskId}"
+        task.id = f"task{state.next_id}"
 
         span = win.createElement("span")
         span.onclick = "RemoveTask(this.parentNode.id)"
@@ -34,9 +38,11 @@ def CreateTask(key):
         win.getElementById("tasks").appendChild(task)
         """
 
-def RemoveTask(taskid):
-    win.getElementById(taskid).remove()
+def RemoveTask(taskId):
+    state.tasks[:] = [task for task in state.tasks if task["id"] != taskId]
 
 win.display(file="render.html", pyfunctions=[CreateTask, RemoveTask])
 
+win.bind_list("tasks", state, "tasks", key=lambda task: task["id"], template=TaskHtml)
+
 win.show()
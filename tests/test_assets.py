@@ -0,0 +1,155 @@
+import gzip
+import http.client
+import os
+
+import pytest
+
+from Neutron.assets import resolve, start_asset_server
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("assets")
+    (tmp_path / "data.bin").write_bytes(CONTENT)
+    (tmp_path / "style.css").write_text("body {}")
+    (tmp_path / "style.css.gz").write_bytes(gzip.compress(b"body {}"))
+    (tmp_path / "cached.bin").write_bytes(CONTENT)
+    (tmp_path / "pages").mkdir()
+    (tmp_path / "pages" / "index.html").write_text("<p>index</p>")
+
+    server = start_asset_server(0, tmp_path)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path, **headers):
+    connection = http.client.HTTPConnection("localhost", server.server_address[1], timeout=5)
+    connection.request("GET", path, headers=headers)
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_file(server):
+    response, body = get(server, "/data.bin")
+    assert response.status == 200
+    assert body == CONTENT
+    assert response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_directory_index(server):
+    response, body = get(server, "/pages/")
+    assert response.status == 200
+    assert body == b"<p>index</p>"
+    assert response.headers["Content-Type"] == "text/html"
+
+
+def test_missing_file(server):
+    response, _ = get(server, "/missing.bin")
+    assert response.status == 404
+
+
+def test_path_outside_of_the_root(server):
+    response, _ = get(server, "/../data.bin")
+    assert response.status == 200
+    response, _ = get(server, "/%2e%2e/%2e%2e/etc/passwd")
+    assert response.status == 404
+
+
+def test_not_modified(server):
+    response, _ = get(server, "/data.bin")
+    etag = response.headers["ETag"]
+
+    not_modified = server.summary().get("not_modified", 0)
+    response, body = get(server, "/data.bin", **{"If-None-Match": f'"other", {etag}'})
+    assert response.status == 304
+    assert body == b""
+    assert server.summary()["not_modified"] == not_modified + 1
+
+    os.utime(os.path.join(server.root, "data.bin"), ns=(0, 0))
+    response, _ = get(server, "/data.bin", **{"If-None-Match": etag})
+    assert response.status == 200
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-9", 0, 9),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1000-5000", 1000, 1023),
+])
+def test_range(server, header, start, end):
+    response, body = get(server, "/data.bin", Range=header)
+    assert response.status == 206
+    assert response.headers["Content-Range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert body == CONTENT[start:end + 1]
+
+
+@pytest.mark.parametrize("header", ["bytes=2000-", "bytes=-0", "bytes=10-5"])
+def test_unsatisfiable_range(server, header):
+    response, body = get(server, "/data.bin", Range=header)
+    assert response.status == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+    assert body == b""
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-6", "lines=0-1", "bytes=a-b"])
+def test_ignored_range(server, header):
+    response, body = get(server, "/data.bin", Range=header)
+    assert response.status == 200
+    assert body == CONTENT
+
+
+def test_precompressed_file(server):
+    response, body = get(server, "/style.css", **{"Accept-Encoding": "gzip, deflate"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Type"] == "text/css"
+    assert gzip.decompress(body) == b"body {}"
+
+    plain, body = get(server, "/style.css")
+    assert "Content-Encoding" not in plain.headers
+    assert body == b"body {}"
+    assert plain.headers["ETag"] != response.headers["ETag"]
+
+
+def test_cache(server):
+    before = server.summary()
+    get(server, "/cached.bin")
+    get(server, "/cached.bin")
+    summary = server.summary()
+    difference = lambda name: summary.get(name, 0) - before.get(name, 0)
+    assert difference("cache_misses") == 1
+    assert difference("cache_hits") == 1
+    assert difference("requests") == 2
+    assert difference("bytes_sent") == 2 * len(CONTENT)
+
+
+def test_large_file(tmp_path):
+    content = os.urandom(300 * 1024)
+    (tmp_path / "large.bin").write_bytes(content)
+    server = start_asset_server(0, tmp_path)
+    try:
+        response, body = get(server, "/large.bin")
+        assert body == content
+        response, body = get(server, "/large.bin", Range="bytes=100-199")
+        assert body == content[100:200]
+        assert "cache_hits" not in server.summary()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_resolve(tmp_path):
+    root = os.path.realpath(tmp_path)
+    (tmp_path / "folder").mkdir()
+    assert resolve(root, "/a/b.txt") == os.path.join(root, "a", "b.txt")
+    assert resolve(root, "/folder") == os.path.join(root, "folder", "index.html")
+    assert resolve(root, "/../../outside") == os.path.join(root, "outside")
+    assert resolve(root, "/a/../../b") == os.path.join(root, "b")
+
+    os.symlink(os.path.dirname(root), tmp_path / "link")
+    assert resolve(root, "/link/x") is None
@@ -0,0 +1,81 @@
+import array
+import json
+import sys
+
+from Neutron import buffers
+
+
+def test_pack_and_unpack():
+    data = array.array("f", [1.5, 2.5, 3.5])
+    message = buffers.pack({"type": "buffer", "name": "points"}, data)
+    assert message[1].obj is data
+
+    header, view = buffers.unpack(b"".join(message))
+    assert header == {"type": "buffer", "name": "points", "array": "Float32Array", "shape": [3]}
+    assert bytes(view) == data.tobytes()
+
+
+def test_data_is_aligned():
+    for name in ("", "a", "ab" * 7, "abc" * 11):
+        prefix, data = buffers.pack({"name": name}, b"\x01\x02")
+        assert len(prefix) % buffers.ALIGNMENT == 0
+        header, view = buffers.unpack(prefix + bytes(data))
+        assert header["name"] == name and bytes(view) == b"\x01\x02"
+
+
+def test_typed_array():
+    assert buffers.typed_array(memoryview(b"abc")) == "Uint8Array"
+    assert buffers.typed_array(memoryview(array.array("d"))) == "Float64Array"
+    assert buffers.typed_array(memoryview(array.array("h"))) == "Int16Array"
+    assert buffers.typed_array(memoryview(array.array("I"))) == "Uint32Array"
+    assert buffers.typed_array(memoryview(b"abcd").cast("?")) == "Uint8Array"
+    assert buffers.typed_array(memoryview(bytes(8)).cast("P")) == "Uint8Array"
+
+
+def test_typed_array_byte_order():
+    # Formats with an explicit byte order come from i.e numpy, typed arrays only use the byte order of the machine
+    class View:
+        def __init__(self, format, itemsize):
+            self.format = format
+            self.itemsize = itemsize
+
+    native = "<" if sys.byteorder == "little" else ">"
+    other = ">" if sys.byteorder == "little" else "<"
+    assert buffers.typed_array(View(native + "d", 8)) == "Float64Array"
+    assert buffers.typed_array(View("=i", 4)) == "Int32Array"
+    assert buffers.typed_array(View(other + "d", 8)) == "Uint8Array"
+
+
+def test_non_contiguous_data_is_copied():
+    data = memoryview(bytes(range(10)))[::2]
+    message = buffers.pack({}, data)
+    header, view = buffers.unpack(b"".join(bytes(fragment) for fragment in message))
+    assert header["shape"] == [5]
+    assert bytes(view) == bytes(range(0, 10, 2))
+
+
+def test_unpack_call():
+    first, second = b"\x01\x02\x03", b"\x04\x05"
+    header = {
+        "function": "h0",
+        "parameters": [{buffers.PLACEHOLDER: 1}, 7, {buffers.PLACEHOLDER: 0}, {"other": 0}],
+        "buffers": [[0, len(first)], [8, len(second)]],
+    }
+    encoded = json.dumps(header).encode()
+    start = buffers.align(4 + len(encoded))
+    message = len(encoded).to_bytes(4, "little") + encoded + bytes(start - 4 - len(encoded))
+    message += first + bytes(8 - len(first)) + second
+
+    call = buffers.unpack_call(message)
+    assert call["function"] == "h0"
+    assert "buffers" not in call
+    assert bytes(call["parameters"][0]) == second
+    assert call["parameters"][1] == 7
+    assert bytes(call["parameters"][2]) == first
+    assert call["parameters"][3] == {"other": 0}
+    assert call["parameters"][0].readonly
+
+
+def test_size():
+    assert buffers.size("abc") == 3
+    assert buffers.size([b"abcd", memoryview(array.array("d", [1.0]))]) == 12
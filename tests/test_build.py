@@ -0,0 +1,97 @@
+import json
+
+import pytest
+from bs4 import BeautifulSoup
+
+from Neutron import build, elements
+
+HTML = '<html><head><title>Test</title></head><body><p id="first">a</p><p>b</p><div id="first"></div></body></html>'
+CSS = "p { color: red; }"
+
+
+@pytest.fixture
+def sources(tmp_path):
+    html = tmp_path / "index.html"
+    css = tmp_path / "style.css"
+    html.write_text(HTML)
+    css.write_text(CSS)
+    return str(html), str(css)
+
+
+def test_build_and_load(sources):
+    html, css = sources
+    path = build.build(html, css)
+    assert path == html + build.BUNDLE_EXTENSION
+
+    bundle = build.load(path, HTML, CSS)
+    assert bundle is not None
+    assert bundle["version"] == build.BUNDLE_VERSION
+    assert bundle["hash"] == build.source_hash(HTML, CSS)
+    assert build.load(path) == bundle
+
+
+def test_changed_sources(sources):
+    html, css = sources
+    path = build.build(html, css)
+    assert build.load(path, HTML + " ", CSS) is None
+    assert build.load(path, HTML, CSS + " ") is None
+    assert build.load(path, HTML) is None
+
+
+def test_other_version(sources):
+    html, css = sources
+    path = build.build(html, css)
+    with open(path) as bundle_file:
+        bundle = json.load(bundle_file)
+    bundle["version"] = build.BUNDLE_VERSION - 1
+    with open(path, "w") as bundle_file:
+        json.dump(bundle, bundle_file)
+    assert build.load(path, HTML, CSS) is None
+
+
+def test_missing_bundle(tmp_path):
+    assert build.load(str(tmp_path / "index.html.neutron")) is None
+
+
+def test_output(sources, tmp_path):
+    html, _ = sources
+    output = str(tmp_path / "other.json")
+    assert build.build(html, output=output) == output
+    assert build.load(output, HTML) is not None
+
+
+def test_bundle_html(sources):
+    html, css = sources
+    bundle = build.load(build.build(html, css))
+    document = bundle["html"]
+
+    styles = BeautifulSoup(document, "html.parser").find_all("style")
+    assert [style.string for style in styles] == [CSS]
+    assert styles[0].has_attr(build.CSS_ATTRIBUTE)
+    assert document.index(build.BRIDGE_MARKER) < document.index("<title ")
+    assert document.count(build.BRIDGE_MARKER) == 1
+
+
+def test_bundle_index(sources):
+    html, css = sources
+    bundle = build.load(build.build(html, css))
+    soup = BeautifulSoup(bundle["html"], "html.parser")
+    paragraphs = [elements.getNeutronId(element) for element in soup.find_all("p")]
+
+    assert bundle["index"]["tags"]["p"] == paragraphs
+    assert bundle["index"]["ids"] == {"first": paragraphs[0]}
+    assert bundle["next_id"] == max(int(NeutronID, 36) for tags in bundle["index"]["tags"].values() for NeutronID in tags) + 1
+
+
+def test_document_without_head(tmp_path):
+    html = tmp_path / "fragment.html"
+    html.write_text("<p>a</p>")
+    bundle = build.load(build.build(str(html)))
+    head = bundle["index"]["tags"]["head"][0]
+    assert bundle["html"].startswith(f'<head data-nid="{head}">{build.BRIDGE_MARKER}</head>')
+
+
+def test_inject():
+    assert build.inject(f"<head>{build.BRIDGE_MARKER}</head>", "<script></script>") == "<head><script></script></head>"
+    assert build.inject("<p>a</p>", "<script></script>") == "<script></script><p>a</p>"
+    assert build.inject(f"{build.BRIDGE_MARKER}{build.BRIDGE_MARKER}", "x") == f"x{build.BRIDGE_MARKER}"
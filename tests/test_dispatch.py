@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from Neutron.dispatch import Dispatcher
+
+
+def wait_idle(dispatcher, timeout=5):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        with dispatcher.lock:
+            if not dispatcher.queued and not dispatcher.lanes:
+                return
+        time.sleep(0.01)
+    raise TimeoutError("The dispatcher did not finish its calls")
+
+
+def blocked(dispatcher):
+    # Occupies the only worker until the returned event is set
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    dispatcher.submit(block, [])
+    assert started.wait(5)
+    return release
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        Dispatcher(drop_policy="drop_all")
+    with pytest.raises(ValueError):
+        Dispatcher(ordering="random")
+
+
+def test_calls_of_a_handler_run_in_order():
+    dispatcher = Dispatcher(max_workers=4, ordering="handler")
+    calls = []
+    running = []
+
+    def handler(value):
+        running.append(value)
+        assert len(running) == 1
+        time.sleep(0.001)
+        calls.append(value)
+        running.remove(value)
+
+    for value in range(50):
+        dispatcher.submit(handler, [value])
+    wait_idle(dispatcher)
+    assert calls == list(range(50))
+    dispatcher.shutdown()
+
+
+def test_calls_of_an_element_run_in_order():
+    dispatcher = Dispatcher(max_workers=4, ordering="element")
+    calls = {"a": [], "b": []}
+
+    def handler(source, value):
+        time.sleep(0.001)
+        calls[source].append(value)
+
+    for value in range(20):
+        for source in calls:
+            dispatcher.submit(handler, [source, value], source)
+    wait_idle(dispatcher)
+    assert calls == {"a": list(range(20)), "b": list(range(20))}
+    dispatcher.shutdown()
+
+
+@pytest.mark.parametrize("drop_policy, expected", [("drop_oldest", [2, 3]), ("drop_newest", [0, 1])])
+def test_drop_policy(drop_policy, expected):
+    dispatcher = Dispatcher(max_workers=1, max_queue=2, drop_policy=drop_policy, ordering=None)
+    calls = []
+    release = blocked(dispatcher)
+
+    for value in range(4):
+        dispatcher.submit(calls.append, [value])
+    assert dispatcher.dropped == 2
+    assert dispatcher.queue_depth == 2
+
+    release.set()
+    wait_idle(dispatcher)
+    assert calls == expected
+    dispatcher.shutdown()
+
+
+def test_exceptions_do_not_stop_the_lane():
+    dispatcher = Dispatcher(max_workers=2)
+    calls = []
+
+    def handler(value):
+        if value == 1:
+            raise ValueError("expected")
+        calls.append(value)
+
+    for value in range(3):
+        dispatcher.submit(handler, [value])
+    wait_idle(dispatcher)
+    assert calls == [0, 2]
+    dispatcher.shutdown()
+
+
+def test_submit_after_shutdown_starts_a_new_pool():
+    dispatcher = Dispatcher()
+    done = threading.Event()
+    dispatcher.shutdown()
+    dispatcher.submit(done.set, [])
+    assert done.wait(5)
+    dispatcher.shutdown()
+
+
+def test_submit_while_shutting_down():
+    dispatcher = Dispatcher()
+    errors = []
+
+    def submit():
+        for _ in range(2000):
+            try:
+                dispatcher.submit(lambda: None, [])
+            except Exception as error:
+                errors.append(error)
+
+    thread = threading.Thread(target=submit)
+    thread.start()
+    while thread.is_alive():
+        dispatcher.shutdown(wait=False)
+    thread.join()
+    assert errors == []
+    dispatcher.shutdown()
@@ -0,0 +1,99 @@
+import itertools
+import random
+
+import pytest
+
+from Neutron.reactive import ListBinding, State, stable
+
+
+class Element:
+    NeutronID = "list"
+
+
+def binding(items):
+    state = State(items=items)
+    return ListBinding(None, Element(), state, "items", key=lambda item: item[0], template=lambda item: f"<li>{item[1]}</li>")
+
+
+def apply(rows, ops):
+    # Applies the ops the way neutronPatch() does in the page, rows are [key, html]
+    rows = [list(row) for row in rows]
+    index = lambda key: next(i for i, row in enumerate(rows) if row[0] == key)
+    for op in ops:
+        kind, _, key = op[:3]
+        if kind == "remove":
+            del rows[index(key)]
+        elif kind == "insert":
+            rows.insert(len(rows) if op[4] is None else index(op[4]), [key, op[3]])
+        elif kind == "move":
+            row = rows.pop(index(key))
+            rows.insert(len(rows) if op[3] is None else index(op[3]), row)
+        elif kind == "replace":
+            rows[index(key)][1] = op[3]
+    return rows
+
+
+def render(items):
+    return [[str(key), f"<li>{text}</li>"] for key, text in items]
+
+
+def check(old, new):
+    list_binding = binding(old)
+    first = list_binding.patch()
+    assert apply([], first) == render(old)
+
+    list_binding.state.items = new
+    ops = list_binding.patch()
+    assert apply(render(old), ops) == render(new)
+    return ops
+
+
+def test_first_patch_inserts_every_row():
+    ops = binding([(1, "a"), (2, "b")]).patch()
+    assert [op[0] for op in ops] == ["insert", "insert"]
+
+
+def test_unchanged_list_sends_nothing():
+    items = [(1, "a"), (2, "b")]
+    list_binding = binding(items)
+    list_binding.patch()
+    assert list_binding.patch() == []
+
+
+def test_changed_row_is_replaced_in_place():
+    ops = check([(1, "a"), (2, "b")], [(1, "a"), (2, "B")])
+    assert ops == [["replace", "list", "2", "<li>B</li>"]]
+
+
+def test_move_to_front_moves_one_row():
+    ops = check([(1, "a"), (2, "b"), (3, "c"), (4, "d")], [(4, "d"), (1, "a"), (2, "b"), (3, "c")])
+    assert [op[0] for op in ops] == ["move"]
+
+
+def test_insert_and_remove():
+    ops = check([(1, "a"), (2, "b"), (3, "c")], [(1, "a"), (5, "e"), (3, "c")])
+    assert sorted(op[0] for op in ops) == ["insert", "remove"]
+
+
+def test_duplicate_keys_are_rejected():
+    with pytest.raises(ValueError):
+        binding([(1, "a"), (1, "b")]).patch()
+
+
+def test_random_permutations():
+    rng = random.Random(14)
+    for _ in range(200):
+        old = [(key, f"row {key}") for key in rng.sample(range(12), rng.randint(0, 10))]
+        new = [(key, f"row {key}" if rng.random() < 0.8 else f"new {key}") for key in rng.sample(range(12), rng.randint(0, 10))]
+        check(old, new)
+
+
+def test_stable_is_a_longest_increasing_run():
+    keys = ["c", "a", "b", "d"]
+    positions = {"a": 0, "b": 1, "c": 2, "d": 3}
+    assert stable(keys, positions) == {"a", "b", "d"}
+
+    for permutation in itertools.permutations(range(5)):
+        keys = [str(position) for position in permutation]
+        stay = [key for key in keys if key in stable(keys, {str(i): i for i in range(5)})]
+        assert stay == sorted(stay, key=int)
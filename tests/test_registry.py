@@ -0,0 +1,109 @@
+import dataclasses
+import gc
+
+from Neutron.registry import Registry
+
+
+class Handler:
+    def method(self):
+        pass
+
+
+def test_function_keeps_its_id():
+    registry = Registry("h")
+    function = lambda: None
+    assert registry.register(function) == registry.register(function) == "h0"
+    assert registry.register(lambda: None) == "h1"
+    assert len(registry) == 2
+
+
+def test_weak_function_is_released_when_collected():
+    released = []
+    registry = Registry("h", on_release=released.extend)
+    function = lambda: None
+    function_id = registry.register(function, weak=True)
+    assert registry.get(function_id) is function
+
+    del function
+    gc.collect()
+    assert released == [function_id]
+    assert registry.get(function_id) is None
+    assert len(registry) == 0
+
+
+def test_weak_bound_method_keeps_its_id():
+    registry = Registry("h")
+    handler = Handler()
+    ids = {registry.register(handler.method, weak=True) for _ in range(5)}
+    assert ids == {"h0"}
+    assert len(registry) == 1
+    assert registry.id(handler.method) == "h0"
+    assert registry.register(Handler().method, weak=True) == "h1"
+
+
+def test_weak_bound_method_is_released_with_its_object():
+    released = []
+    registry = Registry("h", on_release=released.extend)
+    handler = Handler()
+    function_id = registry.register(handler.method, weak=True)
+
+    del handler
+    gc.collect()
+    assert released == [function_id]
+    assert len(registry) == 0
+    assert len(registry.weak_methods) == 0
+
+
+def test_weak_bound_method_of_unhashable_object():
+    @dataclasses.dataclass
+    class Unhashable:
+        value: int = 0
+
+        def method(self):
+            pass
+
+    registry = Registry("h")
+    instance = Unhashable()
+    function_id = registry.register(instance.method, weak=True)
+    assert registry.get(function_id) == instance.method
+
+
+def test_unregister_weak_bound_method():
+    registry = Registry("h")
+    handler = Handler()
+    function_id = registry.register(handler.method, weak=True)
+    assert registry.unregister(handler.method) == function_id
+    assert len(registry) == 0
+    assert registry.register(handler.method, weak=True) != function_id
+
+
+def test_owned_function_is_dropped_with_its_last_owner():
+    registry = Registry("h")
+    function = lambda: None
+    function_id = registry.register(function, owner="a")
+    registry.register(function, owner="b")
+
+    assert registry.release(["a"]) == []
+    assert registry.get(function_id) is function
+    assert registry.release(["b"]) == [function_id]
+    assert registry.get(function_id) is None
+    assert registry.owner_ids() == []
+
+
+def test_pinned_function_outlives_its_owners():
+    registry = Registry("h")
+    function = lambda: None
+    function_id = registry.register(function, owner="a")
+    registry.register(function)
+
+    assert registry.release(["a"]) == []
+    assert registry.get(function_id) is function
+
+
+def test_unregister():
+    registry = Registry("h")
+    function = lambda: None
+    function_id = registry.register(function, owner="a")
+    assert registry.unregister(function) == function_id
+    assert registry.unregister(function_id) is None
+    assert registry.summary() == {"functions": 0, "weak": 0, "owners": 0}
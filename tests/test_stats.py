@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+
+from Neutron.dispatch import Dispatcher
+from Neutron.registry import Registry
+from Neutron.stats import Histogram, Stats
+
+
+def test_histogram():
+    histogram = Histogram()
+    assert histogram.summary() == {"count": 0}
+
+    for milliseconds in range(1, 101):
+        histogram.add(milliseconds / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["min_ms"] == pytest.approx(1)
+    assert summary["max_ms"] == pytest.approx(100)
+    assert summary["mean_ms"] == pytest.approx(50.5)
+    # Percentiles are the upper bound of their bucket
+    assert 50 <= summary["p50_ms"] <= 100
+    assert summary["p50_ms"] <= summary["p90_ms"] <= summary["p99_ms"] <= summary["max_ms"]
+
+
+def test_handlers_are_kept_apart_by_id():
+    # Two lambdas share a name, registered functions are recorded under their ID
+    registry = Registry("h")
+    stats = Stats(enabled=True)
+    dispatcher = Dispatcher(ordering=None)
+    dispatcher.stats = stats
+
+    first, second = lambda: None, lambda: None
+    for function in (first, first, second):
+        dispatcher.submit(function, [], function_id=registry.register(function))
+    dispatcher.shutdown()
+
+    handlers = stats.summary()["handlers"]
+    assert set(handlers) == {"h0", "h1"}
+    assert handlers["h0"]["name"] == handlers["h1"]["name"] == first.__qualname__
+    assert handlers["h0"]["count"] == 2
+    assert handlers["h1"]["count"] == 1
+
+
+def test_bridge_events():
+    stats = Stats(enabled=True)
+    stats.bridge_event("h0", "f", 10)
+    stats.bridge_event("h1", "f", 20)
+    stats.bridge_event("h0", "f", 30)
+
+    summary = stats.summary()
+    assert summary["bridge_events"] == {"h0": {"name": "f", "count": 2}, "h1": {"name": "f", "count": 1}}
+    assert summary["payload_bytes"]["bridge"] == 60
+    assert summary["messages"]["bridge"] == 3
+
+    stats.reset()
+    assert stats.summary()["bridge_events"] == {}
+
+
+def test_trace(tmp_path):
+    path = tmp_path / "trace.json"
+    stats = Stats(trace_file=str(path))
+    assert stats.enabled
+
+    queued = time.perf_counter()
+    stats.handler("h0", "f", queued, time.perf_counter())
+    stats.round_trip("run_javascript", time.perf_counter(), 5, 7)
+    stats.write_trace()
+
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [(event["name"], event["cat"]) for event in events] == [("f", "handler"), ("f", "queue_wait"), ("run_javascript", "round_trip")]
+    assert events[0]["args"] == {"id": "h0"}
+
+
+def test_trace_requires_a_trace_file():
+    with pytest.raises(RuntimeError):
+        Stats(enabled=True).write_trace()